@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+import websockets
+from api.event_loop import EventLoopThread
+
+logger = logging.getLogger('binance_feed')
+
+BINANCE_WS_URL = os.getenv('BINANCE_WS_URL', 'wss://stream.binance.com:9443')
+
+
+class BinanceFeed:
+    """Push-based BTC price feed from the Binance combined WebSocket streams.
+
+    Subscribes to ``<symbol>@trade`` and ``<symbol>@bookTicker`` and keeps the
+    latest price in memory, so callers read it without an HTTP round trip. Every
+    update is also handed to the ``on_price(price, timestamp, source)`` callbacks
+    (on the feed's own loop thread), which is how intra-second moves reach the
+    in-memory candles. The connection is re-established with jittered
+    exponential backoff whenever it drops.
+
+    Prices come from trades; the book ticker mid-price is used only until the
+    first trade arrives or when trades go quiet for longer than ``mid_after``.
+    """
+
+    def __init__(self, symbol='btcusdt', url=None, streams=('trade', 'bookTicker'),
+                 reconnect_delay=1.0, max_reconnect_delay=30.0, mid_after=2.0):
+        self.symbol = symbol.lower()
+        self.url = (url or BINANCE_WS_URL).rstrip('/')
+        self.streams = tuple(streams)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.mid_after = mid_after
+
+        self.last_price = None
+        self.last_update = 0
+        self.last_trade = 0
+        self.is_connected = False
+        self.messages = 0
+        self.reconnects = 0
+
+        self._callbacks = []
+        self._loop_thread = None
+        self._owns_loop = False
+        self._future = None
+        self._stopping = threading.Event()
+
+    @property
+    def stream_url(self):
+        names = '/'.join(f'{self.symbol}@{stream}' for stream in self.streams)
+        return f'{self.url}/stream?streams={names}'
+
+    def add_callback(self, callback):
+        """Call ``callback(price, timestamp, source)`` on every price update"""
+        self._callbacks.append(callback)
+
+    def get_price(self, max_age=None):
+        """Latest price, or None if there is none or it is older than ``max_age`` seconds"""
+        if self.last_price is None:
+            return None
+        if max_age is not None and time.time() - self.last_update > max_age:
+            return None
+        return self.last_price
+
+    def get_stats(self):
+        return {
+            'connected': self.is_connected,
+            'last_price': self.last_price,
+            'age': time.time() - self.last_update if self.last_update else None,
+            'messages': self.messages,
+            'reconnects': self.reconnects
+        }
+
+    def start(self, loop_thread=None):
+        """Start consuming the stream on ``loop_thread`` (a dedicated one by default)"""
+        if self._future is not None and not self._future.done():
+            return
+        self._stopping.clear()
+        self._owns_loop = loop_thread is None
+        self._loop_thread = loop_thread or EventLoopThread(name=f'binance-feed-{self.symbol}')
+        self._future = self._loop_thread.submit(self.run())
+        logger.info(f"Binance feed started for {self.stream_url}")
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        if self._future is not None:
+            self._future.cancel()
+            try:
+                self._future.result(timeout)
+            except Exception:
+                pass
+            self._future = None
+        if self._owns_loop and self._loop_thread is not None:
+            self._loop_thread.stop(timeout)
+            self._loop_thread = None
+
+    def _update(self, price, timestamp, source):
+        self.last_price = price
+        self.last_update = time.time()
+        for callback in self._callbacks:
+            try:
+                callback(price, timestamp, source)
+            except Exception as e:
+                logger.error(f"Error in Binance feed callback: {e}")
+
+    def handle_message(self, raw):
+        """Apply one combined-stream message"""
+        message = json.loads(raw)
+        data = message.get('data', message)
+        event = data.get('e')
+        self.messages += 1
+
+        if event == 'trade':
+            self.last_trade = time.time()
+            self._update(float(data['p']), data.get('T', data.get('E', time.time() * 1000)) / 1000.0, 'trade')
+        elif 'b' in data and 'a' in data:
+            # bookTicker carries no event type or time; use it while trades are quiet
+            if time.time() - self.last_trade > self.mid_after:
+                mid = (float(data['b']) + float(data['a'])) / 2
+                self._update(mid, time.time(), 'book')
+
+    async def run(self):
+        """Consume the stream forever, reconnecting with jittered exponential backoff"""
+        delay = self.reconnect_delay
+        while not self._stopping.is_set():
+            try:
+                async with websockets.connect(self.stream_url, ping_interval=20, close_timeout=2) as ws:
+                    self.is_connected = True
+                    delay = self.reconnect_delay
+                    logger.info("Connected to Binance WebSocket stream")
+                    async for raw in ws:
+                        try:
+                            self.handle_message(raw)
+                        except (ValueError, KeyError) as e:
+                            logger.warning(f"Ignoring malformed Binance message: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Binance WebSocket error: {e}")
+            finally:
+                self.is_connected = False
+
+            if self._stopping.is_set():
+                break
+            self.reconnects += 1
+            wait = delay * random.uniform(0.5, 1.0)
+            logger.info(f"Reconnecting to Binance WebSocket in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            delay = min(self.max_reconnect_delay, delay * 2)
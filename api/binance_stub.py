@@ -0,0 +1,199 @@
+"""Local stand-in for the Binance combined WebSocket stream.
+
+Serves random-walk ``@trade`` and ``@bookTicker`` messages in the same format
+as ``/stream?streams=...`` so BinanceFeed can be exercised and benchmarked
+without network access. Plain HTTP requests to ``/api/v3/klines`` on the same
+port return deterministic one-minute candles with Binance's weight headers, so
+the gap backfill can be run against it too:
+
+    python -m api.binance_stub --port 9001 --rate 50
+    BINANCE_WS_URL=ws://127.0.0.1:9001 BINANCE_KLINE_URL=http://127.0.0.1:9001/api/v3/klines python app.py
+"""
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+from http import HTTPStatus
+from urllib.parse import urlparse, parse_qs
+import websockets
+
+logger = logging.getLogger('binance_stub')
+
+
+class BinanceStubServer:
+    """Pushes synthetic trades and book tickers to every connected client"""
+
+    def __init__(self, host='127.0.0.1', port=9001, rate=20.0, start_price=78000.0, volatility=0.0002,
+                 weight_limit=6000, clock_offset=0.0, retry_after=None):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.price = start_price
+        self.base_price = start_price
+        self.volatility = volatility
+        self.weight_limit = weight_limit
+        # Retry-After sent with a 429, in seconds (default: until the weight minute ends)
+        self.retry_after = retry_after
+        # Seconds added to trade event times, to mimic an exchange clock ahead of (or behind) ours
+        self.clock_offset = clock_offset
+        self.sent = 0
+        self.connections = 0
+        self.kline_requests = 0
+        self._weight_minute = 0
+        self._used_weight = 0
+        self._retry_until = 0.0
+        self._trade_id = 0
+        self._clients = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'ws://{self.host}:{self.port}'
+
+    def _next_messages(self, streams):
+        self.price *= 1 + random.gauss(0, self.volatility)
+        self._trade_id += 1
+        now = int((time.time() + self.clock_offset) * 1000)
+        spread = self.price * 0.00001
+        for stream in streams:
+            symbol, _, kind = stream.partition('@')
+            if kind == 'trade':
+                data = {'e': 'trade', 'E': now, 's': symbol.upper(), 't': self._trade_id,
+                        'p': f'{self.price:.2f}', 'q': '0.001', 'T': now, 'm': random.random() < 0.5}
+            elif kind == 'bookTicker':
+                data = {'u': self._trade_id, 's': symbol.upper(),
+                        'b': f'{self.price - spread:.2f}', 'B': '1.0',
+                        'a': f'{self.price + spread:.2f}', 'A': '1.0'}
+            else:
+                continue
+            yield json.dumps({'stream': stream, 'data': data})
+
+    def _kline(self, open_ms):
+        """Deterministic one-minute candle for an open time, in Binance's array format"""
+        rng = random.Random(open_ms)
+        open_price = self.base_price * (1 + 0.01 * math.sin(open_ms / 3.6e6))
+        close_price = open_price * (1 + rng.gauss(0, self.volatility * 10))
+        high = max(open_price, close_price) * (1 + abs(rng.gauss(0, self.volatility * 5)))
+        low = min(open_price, close_price) * (1 - abs(rng.gauss(0, self.volatility * 5)))
+        volume = rng.uniform(5, 50)
+        return [open_ms, f'{open_price:.2f}', f'{high:.2f}', f'{low:.2f}', f'{close_price:.2f}',
+                f'{volume:.5f}', open_ms + 59999, '0', 100, '0', '0', '0']
+
+    def _klines_response(self, query):
+        """(status, headers, body) for a klines request, enforcing the per-minute weight limit"""
+        now = time.time()
+        minute = int(now // 60)
+        if minute != self._weight_minute:
+            self._weight_minute = minute
+            self._used_weight = 0
+        self.kline_requests += 1
+
+        # Like Binance, a client that ignores Retry-After gets banned
+        if now < self._retry_until:
+            headers = [('Content-Type', 'application/json'), ('Retry-After', str(math.ceil(self._retry_until - now)))]
+            body = {'code': -1003, 'msg': 'Way too many requests; IP banned'}
+            return HTTPStatus.IM_A_TEAPOT, headers, json.dumps(body).encode()
+
+        limit = min(int(query.get('limit', ['500'])[0]), 1000)
+        self._used_weight += 2 if limit > 100 else 1
+        headers = [('Content-Type', 'application/json'), ('X-MBX-USED-WEIGHT-1M', str(self._used_weight))]
+
+        if self._used_weight > self.weight_limit:
+            retry_after = self.retry_after if self.retry_after is not None else (minute + 1) * 60 - int(now)
+            self._retry_until = now + retry_after
+            headers.append(('Retry-After', str(retry_after)))
+            body = {'code': -1003, 'msg': 'Too many requests'}
+            return HTTPStatus.TOO_MANY_REQUESTS, headers, json.dumps(body).encode()
+
+        now_ms = int(time.time() * 1000)
+        start_ms = int(query.get('startTime', [now_ms - limit * 60000])[0])
+        end_ms = int(query.get('endTime', [now_ms])[0])
+        first = -(-start_ms // 60000) * 60000
+        candles = [self._kline(open_ms) for open_ms in range(first, min(end_ms, now_ms) + 1, 60000)][:limit]
+        return HTTPStatus.OK, headers, json.dumps(candles).encode()
+
+    def _process_request(self, path, request_headers):
+        """Answer plain HTTP kline requests; let WebSocket upgrades through"""
+        parsed = urlparse(path)
+        if parsed.path == '/api/v3/klines':
+            return self._klines_response(parse_qs(parsed.query))
+        return None
+
+    async def _handler(self, websocket, path=None):
+        path = path or getattr(websocket, 'path', '')
+        streams = parse_qs(urlparse(path).query).get('streams', ['btcusdt@trade'])[0].split('/')
+        interval = 1.0 / self.rate
+        self.connections += 1
+        self._clients.add(websocket)
+        try:
+            while True:
+                for message in self._next_messages(streams):
+                    await websocket.send(message)
+                    self.sent += 1
+                await asyncio.sleep(interval)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.discard(websocket)
+
+    def drop_clients(self):
+        """Close every client connection abruptly, as a network drop would (server keeps running)"""
+        def drop():
+            for websocket in list(self._clients):
+                websocket.transport.abort()
+        self._loop.call_soon_threadsafe(drop)
+
+    async def serve(self):
+        """Serve until cancelled"""
+        async with websockets.serve(self._handler, self.host, self.port, process_request=self._process_request):
+            logger.info(f"Binance stub serving on {self.url}")
+            await asyncio.Future()
+
+    def start(self):
+        """Run the server in a background thread (for tests and benchmarks)"""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                websockets.serve(self._handler, self.host, self.port, process_request=self._process_request)
+            )
+            started.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='binance-stub', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop = None
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Local stand-in for the Binance WebSocket stream')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--rate', type=float, default=20.0, help='updates per second')
+    parser.add_argument('--price', type=float, default=78000.0, help='starting price')
+    parser.add_argument('--weight-limit', type=int, default=6000, help='kline request weight per minute before 429')
+    args = parser.parse_args()
+    try:
+        asyncio.run(BinanceStubServer(args.host, args.port, args.rate, args.price,
+                                      weight_limit=args.weight_limit).serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,269 @@
+import time
+import random
+import asyncio
+import logging
+from metaapi_cloud_sdk import MetaApi, SynchronizationListener
+
+logger = logging.getLogger('connection_registry')
+
+# Health states of a SharedConnection
+DISCONNECTED = 'disconnected'
+CONNECTING = 'connecting'
+CONNECTED = 'connected'
+SYNCHRONIZED = 'synchronized'
+DEGRADED = 'degraded'
+
+
+class ConnectionBackoffError(ConnectionError):
+    """Raised instead of reconnecting while a failed account connection is backing off"""
+
+    def __init__(self, account_id, retry_in):
+        super().__init__(f"Connection to account {account_id} failed recently; retrying in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class _HealthListener(SynchronizationListener):
+    """Follows the websocket's own reconnects to keep SharedConnection.state accurate"""
+
+    def __init__(self, shared):
+        super().__init__()
+        self.shared = shared
+
+    async def on_connected(self, instance_index, replicas):
+        if self.shared.state == DEGRADED:
+            self.shared.state = CONNECTED
+
+    async def on_disconnected(self, instance_index):
+        if self.shared.is_connected:
+            logger.warning(f"Streaming connection to account {self.shared.account_id} lost")
+            self.shared.state = DEGRADED
+            # Make the next connect(wait_for_sync=True) wait for the resynchronization
+            self.shared.is_synchronized = False
+
+
+class SharedConnection:
+    """One MetaAPI streaming connection to an account, shared by every user in the process.
+
+    The deploy check, broker connection and terminal state synchronization are
+    done once here no matter how many components use the account. Users take a
+    reference with ConnectionRegistry.acquire and give it back with release; the
+    connection is closed when the last reference is released.
+
+    ``connect`` is single-flight: concurrent callers wait on one lock and share
+    the result of a single handshake. After a failure further attempts are
+    refused with ConnectionBackoffError for a jittered, exponentially growing
+    delay, so a burst of requests during an outage does not pile up handshakes.
+    """
+
+    # Backoff after consecutive failures: base * 2 ** (failures - 1), capped, with jitter
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 60.0
+
+    def __init__(self, registry, account_id, token):
+        self.registry = registry
+        self.account_id = account_id
+        self.token = token
+        self.account = None
+        self.connection = None
+        self.refs = 0
+        self.listeners = []
+        self.is_connected = False
+        self.is_synchronized = False
+        self.state = DISCONNECTED
+        self.failures = 0
+        self.retry_at = 0
+        self._lock = asyncio.Lock()
+        self._health_listener = _HealthListener(self)
+
+    def health(self):
+        """Connection state, consecutive failures and seconds until the next attempt is allowed"""
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_in': max(0.0, self.retry_at - time.monotonic()),
+            'refs': self.refs
+        }
+
+    @property
+    def api(self):
+        return self.registry.get_api(self.token)
+
+    @property
+    def terminal_state(self):
+        return self.connection.terminal_state if self.connection else None
+
+    def add_listener(self, listener):
+        """Register a synchronization listener, now and on any future connection"""
+        if listener in self.listeners:
+            return
+        self.listeners.append(listener)
+        if self.connection:
+            self.connection.add_synchronization_listener(listener)
+
+    def remove_listener(self, listener):
+        if listener not in self.listeners:
+            return
+        self.listeners.remove(listener)
+        if self.connection:
+            self.connection.remove_synchronization_listener(listener)
+
+    async def get_account(self):
+        """Get the MetaTrader account, deploying it if needed"""
+        if not self.account:
+            self.account = await self.api.metatrader_account_api.get_account(self.account_id)
+            logger.info(f"Connected to account ID: {self.account_id}")
+
+        if self.account.state not in ['DEPLOYING', 'DEPLOYED']:
+            logger.info('Deploying account...')
+            await self.account.deploy()
+            logger.info('Account deployed')
+        return self.account
+
+    def _is_ready(self, wait_for_sync):
+        return self.is_connected and (self.is_synchronized or not wait_for_sync)
+
+    def _check_backoff(self):
+        retry_in = self.retry_at - time.monotonic()
+        if retry_in > 0:
+            raise ConnectionBackoffError(self.account_id, retry_in)
+
+    async def connect(self, wait_for_sync=True):
+        """Open the streaming connection if needed and optionally wait for synchronization
+
+        Returns:
+            connection: The streaming connection object.
+
+        Raises:
+            ConnectionBackoffError: if a recent attempt failed and the backoff has not expired
+        """
+        if self._is_ready(wait_for_sync):
+            return self.connection
+        self._check_backoff()
+
+        async with self._lock:
+            # Whoever held the lock may already have done the work (or failed)
+            if self._is_ready(wait_for_sync):
+                return self.connection
+            self._check_backoff()
+
+            if not self.is_connected:
+                self.state = CONNECTING
+            try:
+                connection = await self._connect(wait_for_sync)
+            except Exception:
+                self.failures += 1
+                delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (self.failures - 1))
+                delay *= random.uniform(0.5, 1.0)
+                self.retry_at = time.monotonic() + delay
+                self.state = DEGRADED if self.is_connected else DISCONNECTED
+                logger.warning(f"Connection to account {self.account_id} failed "
+                               f"({self.failures} in a row); next attempt in {delay:.1f}s")
+                raise
+
+            self.failures = 0
+            self.retry_at = 0
+            self.state = SYNCHRONIZED if self.is_synchronized else CONNECTED
+            return connection
+
+    async def _connect(self, wait_for_sync):
+        if not self.is_connected:
+            account = await self.get_account()
+
+            logger.info('Waiting for API server to connect to broker...')
+            await account.wait_connected()
+
+            if not self.connection:
+                self.connection = account.get_streaming_connection()
+                # Listeners are added before connecting so they see the initial synchronization
+                self.connection.add_synchronization_listener(self._health_listener)
+                for listener in self.listeners:
+                    self.connection.add_synchronization_listener(listener)
+
+            await self.connection.connect()
+            self.is_connected = True
+            logger.info('Connected to streaming API')
+
+        if wait_for_sync and not self.is_synchronized:
+            logger.info('Waiting for terminal state synchronization...')
+            await self.connection.wait_synchronized()
+            self.is_synchronized = True
+            logger.info('Terminal state synchronized')
+
+        return self.connection
+
+    async def close(self):
+        """Close the streaming connection; the next connect() opens a new one"""
+        connection = self.connection
+        self.connection = None
+        self.is_connected = False
+        self.is_synchronized = False
+        self.state = DISCONNECTED
+        if connection:
+            try:
+                await connection.close()
+                logger.info("Closed streaming connection")
+            except Exception as e:
+                logger.error(f"Error closing connection: {e}")
+
+
+class ConnectionRegistry:
+    """Reference-counted registry of shared MetaAPI clients and streaming connections.
+
+    There is one MetaApi client per token and one SharedConnection per account,
+    so MetaApiStreamingManager and PositionTracker use the same websocket and
+    terminal state instead of synchronizing the account twice.
+    """
+
+    def __init__(self):
+        self._apis = {}
+        self._connections = {}
+
+    def get_api(self, token):
+        """Shared MetaApi client for a token"""
+        api = self._apis.get(token)
+        if api is None:
+            api = MetaApi(token)
+            self._apis[token] = api
+            logger.info("MetaAPI client initialized")
+        return api
+
+    def get(self, account_id):
+        """The shared connection for an account, or None if nobody holds it"""
+        return self._connections.get(account_id)
+
+    def acquire(self, account_id, token, listener=None):
+        """Take a reference to the shared connection for an account
+
+        This does not touch the network; call ``connect()`` on the result.
+
+        Args:
+            account_id (str): MetaAPI account ID.
+            token (str): MetaAPI token, used if this is the first reference.
+            listener: Optional synchronization listener to register on the connection.
+
+        Returns:
+            SharedConnection
+        """
+        shared = self._connections.get(account_id)
+        if shared is None:
+            shared = SharedConnection(self, account_id, token)
+            self._connections[account_id] = shared
+        shared.refs += 1
+        if listener is not None:
+            shared.add_listener(listener)
+        return shared
+
+    async def release(self, shared, listener=None):
+        """Drop a reference; the connection is closed once nobody holds it"""
+        if listener is not None:
+            shared.remove_listener(listener)
+        shared.refs -= 1
+        if shared.refs > 0:
+            return
+        if self._connections.get(shared.account_id) is shared:
+            del self._connections[shared.account_id]
+        await shared.close()
+
+
+# Registry shared by every MetaAPI user in the process
+connection_registry = ConnectionRegistry()
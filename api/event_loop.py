@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import logging
+import concurrent.futures
+
+logger = logging.getLogger('event_loop')
+
+
+class EventLoopThread:
+    """A single long-lived asyncio loop running in a daemon thread.
+
+    MetaAPI connections are bound to the loop that created them, so every
+    coroutine that touches them is submitted here instead of each caller
+    creating (and tearing down) a loop of its own. Synchronous code such as
+    Flask handlers and the collector thread uses ``run`` to wait for a result.
+    """
+
+    def __init__(self, name='metaapi-loop'):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """The running loop, started on first use"""
+        if self._loop is None:
+            self.start()
+        return self._loop
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_loop_thread(self):
+        """True when called from the loop's own thread"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self):
+        with self._lock:
+            if self.is_running:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+                # Let pending callbacks (connection close handlers) finish before closing
+                try:
+                    pending = asyncio.all_tasks(loop)
+                    for task in pending:
+                        task.cancel()
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                finally:
+                    loop.close()
+
+            self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+            self._thread.start()
+            started.wait()
+            self._loop = loop
+            logger.info(f"Started event loop thread '{self.name}'")
+            return loop
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes
+
+        Args:
+            coro: coroutine object to run
+            timeout: seconds to wait; the coroutine is cancelled if it takes longer
+
+        Raises:
+            TimeoutError: if the coroutine did not finish within ``timeout``
+            RuntimeError: if called from the loop thread itself (it would deadlock)
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("EventLoopThread.run() called from its own loop; await the coroutine instead")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Coroutine did not finish within {timeout} seconds")
+
+    def stop(self, timeout=5):
+        """Stop the loop and wait for its thread to exit"""
+        with self._lock:
+            if not self.is_running:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+            self._loop = None
+
+
+# Shared loop for all MetaAPI work in the process
+metaapi_loop = EventLoopThread()
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared MetaAPI loop from synchronous code"""
+    return metaapi_loop.run(coro, timeout)
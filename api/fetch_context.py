@@ -0,0 +1,58 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+logger = logging.getLogger('fetch_context')
+
+# Shared pool for upstream calls; they are I/O bound so threads are enough
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fetch')
+
+
+class FetchContext:
+    """Per-request fan-out and de-duplication of upstream calls.
+
+    ``submit`` starts a call on the shared thread pool and returns its future;
+    submitting the same function with the same arguments again in the same
+    context returns the existing future, so each upstream is hit at most once
+    per request. Independent calls therefore run concurrently and the request
+    costs roughly the slowest round trip instead of the sum of all of them.
+
+    ``get`` waits for a result. If the call has not started yet (the pool is
+    busy) it is run inline instead, so fetch functions can safely ``get`` each
+    other from inside the pool without exhausting it.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor or _executor
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Start ``fn(*args)`` unless it is already running in this context"""
+        key = (fn, args)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self.executor.submit(fn, *args)
+                self._futures[key] = future
+        return future
+
+    def get(self, fn, *args, timeout=None):
+        """Result of ``fn(*args)``, sharing any call already submitted in this context"""
+        key = (fn, args)
+        run_here = False
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or future.cancel():
+                # Not started yet (or the pool is busy): run it here rather than wait for a worker
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._futures[key] = future
+                run_here = True
+
+        if run_here:
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result(timeout)
@@ -0,0 +1,125 @@
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('http_client')
+
+# (connect, read) timeouts in seconds for every outbound call
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+
+# Response statuses retried by default; clients that honour Retry-After themselves leave out 429
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpClient:
+    """Keep-alive HTTP sessions shared by every REST call in the process.
+
+    One ``requests.Session`` is kept per scheme and host, so repeated calls to
+    Binance or MetaAPI reuse pooled connections instead of paying a TCP and
+    TLS handshake each time. Every request gets connect/read timeouts, idempotent
+    requests are retried with exponential backoff on connection errors and
+    429/5xx responses, and per-host latency and error counts are kept for
+    ``get_stats``.
+    """
+
+    def __init__(self, timeout=None, retries=HTTP_RETRIES, backoff_factor=0.3, pool_maxsize=10,
+                 retry_statuses=RETRY_STATUSES):
+        self.timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        self.retries = retries
+        self.retry_statuses = tuple(retry_statuses)
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.retry_statuses,
+            # urllib3 retries any 429 carrying Retry-After unless told not to honour the header
+            respect_retry_after_header=429 in self.retry_statuses,
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session(self, url):
+        """Pooled session for the host of ``url``"""
+        parts = urlsplit(url)
+        key = f'{parts.scheme}://{parts.netloc}'
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._new_session()
+                    self._sessions[key] = session
+        return session
+
+    def _record(self, url, elapsed, error):
+        host = urlsplit(url).netloc
+        with self._lock:
+            stats = self._stats.get(host)
+            if stats is None:
+                stats = self._stats[host] = {'requests': 0, 'errors': 0, 'total_time': 0.0, 'max_time': 0.0}
+            stats['requests'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+            if error:
+                stats['errors'] += 1
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request through the host's pooled session and record its latency"""
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self.session(url).request(method, url, timeout=timeout or self.timeout, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            self._record(url, time.perf_counter() - start, error)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self):
+        """Per-host request counts, error counts and latencies in milliseconds"""
+        with self._lock:
+            return {
+                host: {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'avg_ms': round(1000 * stats['total_time'] / stats['requests'], 1),
+                    'max_ms': round(1000 * stats['max_time'], 1)
+                }
+                for host, stats in self._stats.items()
+            }
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Shared client for the process
+http_client = HttpClient()
@@ -1,10 +1,18 @@
 import os
 import sys
 import json
-import requests
 from flask import Flask, render_template, jsonify, request
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+try:
+    from api.http_client import http_client
+except ImportError:
+    # Serverless entry points may run with api/ itself on the import path
+    from http_client import http_client
+try:
+    from api.fetch_context import FetchContext
+except ImportError:
+    from fetch_context import FetchContext
 
 # Load environment variables
 load_dotenv()
@@ -44,7 +52,7 @@ else:
 def fetch_btc_price():
     global last_btc_price
     try:
-        response = requests.get(BINANCE_API_URL)
+        response = http_client.get(BINANCE_API_URL)
         data = response.json()
         price = float(data['price'])
         last_btc_price = price  # Update last known price
@@ -54,7 +62,7 @@ def fetch_btc_price():
         return last_btc_price
 
 # Function to get MT5 equity (using direct REST API call)
-def get_mt5_equity():
+def get_mt5_equity(ctx=None):
     global last_equity
     
     if meta_api_ready:
@@ -67,7 +75,7 @@ def get_mt5_equity():
             # Get account information endpoint
             url = f"https://{META_API_DOMAIN}/users/current/accounts/{META_ACCOUNT_ID}/account-information"
             
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers)
             if response.status_code == 200:
                 data = response.json()
                 if 'equity' in data:
@@ -79,7 +87,8 @@ def get_mt5_equity():
             print(f"Error fetching MT5 equity via API: {e}")
     
     # Simulation mode - generate simple equity value
-    btc_price = fetch_btc_price()
+    # (shares the request's BTC price fetch instead of making a second call)
+    btc_price = ctx.get(fetch_btc_price) if ctx else fetch_btc_price()
     base_equity = 10000
     # Simplified calculation without math module
     equity = base_equity * (1 + (btc_price / 65000 - 1) * 0.05)
@@ -101,7 +110,7 @@ def get_btc_position():
             # Get positions endpoint
             url = f"https://{META_API_DOMAIN}/users/current/accounts/{META_ACCOUNT_ID}/positions"
             
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers)
             if response.status_code == 200:
                 positions = response.json()
                 
@@ -163,14 +172,15 @@ def index():
 # API endpoint for updating chart data
 @app.route('/update-data')
 def update_data():
-    # Fetch BTC price from Binance
-    btc_price = fetch_btc_price()
-    
-    # Get real MT5 equity from MetaAPI
-    equity = get_mt5_equity()
+    # Fetch BTC price, MT5 equity and BTC position concurrently
+    ctx = FetchContext()
+    ctx.submit(fetch_btc_price)
+    ctx.submit(get_mt5_equity, ctx)
+    ctx.submit(get_btc_position)
     
-    # Get real BTC position from MetaAPI
-    btc_position = get_btc_position()
+    btc_price = ctx.get(fetch_btc_price)
+    equity = ctx.get(get_mt5_equity, ctx)
+    btc_position = ctx.get(get_btc_position)
     
     # Position color mapping
     position_color = {
@@ -208,11 +218,13 @@ def btc_price_endpoint():
 # Endpoint for MT5 data only (slower updates - every 3 seconds)
 @app.route('/mt5-data')
 def mt5_data_endpoint():
-    # Get real MT5 equity from MetaAPI
-    equity = get_mt5_equity()
+    # Get real MT5 equity and BTC position from MetaAPI concurrently
+    ctx = FetchContext()
+    ctx.submit(get_mt5_equity, ctx)
+    ctx.submit(get_btc_position)
     
-    # Get real BTC position from MetaAPI
-    btc_position = get_btc_position()
+    equity = ctx.get(get_mt5_equity, ctx)
+    btc_position = ctx.get(get_btc_position)
     
     # Position color mapping
     position_color = {
@@ -1,6 +1,5 @@
 import json
 import os
-import requests
 import math
 import random
 import plotly
@@ -9,6 +8,11 @@ from plotly.subplots import make_subplots
 from flask import Flask, render_template, jsonify, request
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+try:
+    from api.http_client import http_client
+except ImportError:
+    # Serverless entry points may run with api/ itself on the import path
+    from http_client import http_client
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,7 +37,7 @@ def fetch_btc_price():
     """Fetch current BTC price from Binance API"""
     global last_btc_price
     try:
-        response = requests.get(BINANCE_API_URL)
+        response = http_client.get(BINANCE_API_URL)
         data = response.json()
         price = float(data['price'])
         last_btc_price = price  # Update last known price
@@ -85,7 +89,7 @@ def simulate_btc_position():
             'interval': '1m',  # 1-minute candles
             'limit': 10  # Look at 10 recent candles for better trend identification
         }
-        response = requests.get(BINANCE_KLINE_URL, params=params)
+        response = http_client.get(BINANCE_KLINE_URL, params=params)
         data = response.json()
         
         if len(data) >= 5:
@@ -164,7 +168,7 @@ def fetch_historical_btc_data(timeframe='5h'):
     }
     
     try:
-        response = requests.get(BINANCE_KLINE_URL, params=params)
+        response = http_client.get(BINANCE_KLINE_URL, params=params)
         data = response.json()
         
         # Transform data to the format we need
@@ -1,9 +1,8 @@
 import os
-import asyncio
-from metaapi_cloud_sdk import MetaApi
 from datetime import datetime, timedelta
-import time
 import logging
+from api.event_loop import run_sync
+from api.connection_registry import connection_registry, ConnectionBackoffError
 
 logger = logging.getLogger('meta_api_streaming')
 
@@ -17,98 +16,82 @@ class MetaApiStreamingManager:
         """
         self.token = token or os.getenv('META_API_KEY')
         self.account_id = account_id or os.getenv('META_ACCOUNT_ID')
-        self.api = None
-        self.account = None
-        self.connection = None
-        self.is_connected = False
-        self.is_synchronized = False
-        self.is_connecting = False
-        self.last_connection_attempt = 0
-        self.reconnect_interval = 30  # seconds
+        self.shared = None
+
+    @property
+    def connection(self):
+        """The shared streaming connection, or None if not connected yet."""
+        return self.shared.connection if self.shared else None
+
+    @property
+    def is_connected(self):
+        return bool(self.shared and self.shared.is_connected)
+
+    @property
+    def is_synchronized(self):
+        return bool(self.shared and self.shared.is_synchronized)
+
+    def health(self):
+        """Health of the shared connection (state, consecutive failures, backoff remaining)."""
+        if not self.shared:
+            return {'state': 'disconnected', 'failures': 0, 'retry_in': 0.0, 'refs': 0}
+        return self.shared.health()
+
+    def run_sync(self, coro, timeout=None):
+        """Run one of this manager's coroutines on the shared MetaAPI loop.
+        
+        The streaming connection is bound to that loop, so synchronous callers
+        must go through here rather than creating an event loop of their own.
+        
+        Args:
+            coro: Coroutine to run, e.g. self.connect_streaming().
+            timeout (float): Seconds to wait before cancelling it.
+        """
+        return run_sync(coro, timeout)
+
+    def _acquire(self):
+        """Take this manager's reference to the process-wide connection for the account."""
+        if not self.shared:
+            self.shared = connection_registry.acquire(self.account_id, self.token)
+        return self.shared
 
     async def initialize(self):
         """Initialize the API client."""
-        if not self.api:
-            self.api = MetaApi(self.token)
-            logger.info("MetaAPI client initialized")
-        return self.api
+        return self._acquire().api
 
     async def get_account(self):
-        """Get the MetaTrader account."""
-        if not self.account:
-            try:
-                self.api = await self.initialize()
-                self.account = await self.api.metatrader_account_api.get_account(self.account_id)
-                logger.info(f"Connected to account ID: {self.account_id}")
-            except Exception as e:
-                logger.error(f"Error connecting to account: {e}")
-                raise
-        return self.account
+        """Get the MetaTrader account, deploying it if needed."""
+        try:
+            return await self._acquire().get_account()
+        except Exception as e:
+            logger.error(f"Error connecting to account: {e}")
+            raise
 
     async def ensure_deployed(self):
         """Ensure the account is deployed and ready to use."""
-        account = await self.get_account()
-        initial_state = account.state
-        deployed_states = ['DEPLOYING', 'DEPLOYED']
-
-        if initial_state not in deployed_states:
-            logger.info('Deploying account...')
-            await account.deploy()
-            logger.info('Account deployed')
-
-        return account
+        return await self.get_account()
 
     async def connect_streaming(self, wait_for_sync=True):
         """Connect to the streaming API.
         
+        The connection comes from the process-wide connection registry, so it is
+        shared with the position tracker and the account is synchronized once.
+        Concurrent callers share a single handshake; after a failure, calls fail
+        fast with ConnectionBackoffError until the jittered backoff expires.
+        
         Args:
             wait_for_sync (bool): Whether to wait for terminal state synchronization.
             
         Returns:
             connection: The streaming connection object.
         """
-        current_time = time.time()
-        
-        # Prevent multiple concurrent connection attempts
-        if self.is_connecting:
-            return self.connection
-            
-        # Rate limit reconnection attempts
-        if current_time - self.last_connection_attempt < self.reconnect_interval and self.connection:
-            return self.connection
-            
-        self.is_connecting = True
-        self.last_connection_attempt = current_time
-        
         try:
-            account = await self.ensure_deployed()
-            
-            logger.info('Waiting for API server to connect to broker...')
-            await account.wait_connected()
-            
-            # Connect to MetaApi API
-            if not self.connection:
-                self.connection = account.get_streaming_connection()
-                
-            if not self.is_connected:
-                await self.connection.connect()
-                self.is_connected = True
-                logger.info('Connected to streaming API')
-            
-            # Wait for synchronization if requested
-            if wait_for_sync and not self.is_synchronized:
-                logger.info('Waiting for terminal state synchronization...')
-                await self.connection.wait_synchronized()
-                self.is_synchronized = True
-                logger.info('Terminal state synchronized')
-                
-            return self.connection
-            
+            return await self._acquire().connect(wait_for_sync=wait_for_sync)
+        except ConnectionBackoffError:
+            raise
         except Exception as e:
             logger.error(f"Error in connect_streaming: {e}")
             raise
-        finally:
-            self.is_connecting = False
             
     async def get_account_information(self):
         """Get account information from the streaming connection.
@@ -215,20 +198,17 @@ class MetaApiStreamingManager:
             return None
             
     async def close_connection(self):
-        """Close the streaming connection."""
-        if self.connection and self.is_connected:
-            try:
-                await self.connection.close()
-                self.is_connected = False
-                self.is_synchronized = False
-                logger.info("Closed streaming connection")
-            except Exception as e:
-                logger.error(f"Error closing connection: {e}")
+        """Release this manager's reference to the streaming connection.
+        
+        The connection itself is closed once no other component holds it.
+        """
+        if self.shared:
+            shared = self.shared
+            self.shared = None
+            await connection_registry.release(shared)
 
     async def reconnect(self):
         """Reconnect to the streaming API."""
-        if self.connection and self.is_connected:
-            await self.close_connection()
-        
-        self.connection = None
+        # Drops the shared connection for every user; it is reopened with the same listeners
+        await self._acquire().close()
         return await self.connect_streaming()
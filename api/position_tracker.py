@@ -1,18 +1,205 @@
 import logging
 import os
-from metaapi_cloud_sdk import MetaApi
+import time
+import threading
+from collections import namedtuple
+from metaapi_cloud_sdk import SynchronizationListener
+from api.event_loop import run_sync
+from api.connection_registry import connection_registry
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('position_tracker')
 
+BTC_KEYWORDS = ['BTC', 'BITCOIN', 'XBT', 'BTCUSD', 'XBTUSD']
+
+# Names brokers use for a base asset; assets not listed here match on their own ticker
+ASSET_ALIASES = {'BTC': BTC_KEYWORDS}
+
+# Quote currencies stripped from exchange symbols to find the base asset (BTCUSDT -> BTC)
+QUOTE_ASSETS = ('USDT', 'USDC', 'BUSD', 'USD')
+
+# Immutable view of the account kept current by AccountStateListener.
+# ``positions`` holds only BTC positions and ``position_status`` describes them;
+# ``asset_status`` maps every watched base asset to the same kind of description.
+# ``version`` increases with every update.
+AccountSnapshot = namedtuple('AccountSnapshot', [
+    'version', 'updated_at', 'account_information', 'equity', 'positions', 'position_status',
+    'asset_status'
+])
+
+
+def describe_position(positions):
+    """Build the status/color/details dict shown on the dashboard from a list of BTC positions"""
+    if not positions:
+        return {
+            'status': 'No Position',
+            'color': '#999999',
+            'details': None
+        }
+        
+    # Get the first BTC position (assuming one position at a time)
+    position = positions[0]
+    is_buy = position['type'] == 'POSITION_TYPE_BUY'
+    return {
+        'status': 'Buy' if is_buy else 'Sell',
+        'color': '#00aa00' if is_buy else '#aa0000',  # Green for buy, red for sell
+        'details': {
+            'volume': position.get('volume', 0),
+            'profit': position.get('profit', 0),
+            'open_price': position.get('openPrice', 0),
+            'symbol': position.get('symbol', ''),
+            'time': position.get('time', 0),
+            'comment': position.get('comment', ''),
+            'swap': position.get('swap', 0),
+            'margin_rate': position.get('marginRate', 0)
+        }
+    }
+
+
+def base_asset(symbol):
+    """Base asset of an exchange symbol, e.g. 'ETHUSDT' -> 'ETH'"""
+    symbol = symbol.upper()
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)]
+    return symbol
+
+
+def matches_asset(position, asset):
+    """True if an MT5 position's symbol refers to the given base asset"""
+    symbol = position['symbol'].upper()
+    return any(keyword in symbol for keyword in ASSET_ALIASES.get(asset, [asset]))
+
+
+def is_btc_position(position):
+    return matches_asset(position, 'BTC')
+
+
+class AccountStateListener(SynchronizationListener):
+    """Keeps an in-process snapshot of equity and positions in the watched assets from MetaAPI events.
+
+    MetaAPI pushes account-information and position changes to registered
+    synchronization listeners as they happen. Each event rebuilds a small
+    immutable AccountSnapshot and swaps it in, so readers get the current
+    state with a single attribute read instead of filtering the terminal
+    state on every poll.
+    """
+
+    def __init__(self, assets=('BTC',)):
+        super().__init__()
+        self.assets = tuple(assets)
+        self._positions = {}
+        self._account_information = None
+        self._version = 0
+        self._handlers = []
+        self._lock = threading.Lock()
+        self.snapshot = AccountSnapshot(0, 0, None, None, (), describe_position([]),
+                                        {asset: describe_position([]) for asset in self.assets})
+
+    def _is_watched(self, position):
+        return any(matches_asset(position, asset) for asset in self.assets)
+
+    def watch_assets(self, assets):
+        """Track positions in ``assets`` (base assets such as 'BTC', 'ETH') from the next update on"""
+        self.assets = tuple(dict.fromkeys(('BTC',) + tuple(assets)))
+
+    @property
+    def has_account_information(self):
+        return self.snapshot.account_information is not None
+
+    def add_update_handler(self, handler):
+        """Call ``handler(snapshot)`` after every update (runs on the MetaAPI loop thread)"""
+        self._handlers.append(handler)
+
+    def _publish(self):
+        with self._lock:
+            self._version += 1
+            watched = list(self._positions.values())
+            positions = tuple(p for p in watched if is_btc_position(p))
+            account_information = self._account_information
+            equity = None
+            if account_information:
+                equity = account_information.get('equity', account_information.get('balance'))
+            asset_status = {
+                asset: describe_position([p for p in watched if matches_asset(p, asset)])
+                for asset in self.assets
+            }
+            self.snapshot = AccountSnapshot(self._version, time.time(), account_information,
+                                            equity, positions, describe_position(positions), asset_status)
+            snapshot = self.snapshot
+
+        for handler in self._handlers:
+            try:
+                handler(snapshot)
+            except Exception as e:
+                logger.error(f"Error in account update handler: {e}")
+
+    def load_terminal_state(self, terminal_state):
+        """Seed the snapshot from a terminal state that was synchronized before this listener was added"""
+        self._positions = {p['id']: p for p in terminal_state.positions if self._is_watched(p)}
+        if terminal_state.account_information:
+            self._account_information = dict(terminal_state.account_information)
+        self._publish()
+
+    async def on_account_information_updated(self, instance_index, account_information):
+        self._account_information = dict(account_information)
+        self._publish()
+
+    async def on_positions_replaced(self, instance_index, positions):
+        self._positions = {p['id']: p for p in positions if self._is_watched(p)}
+        self._publish()
+
+    async def on_positions_updated(self, instance_index, positions, removed_positions_ids):
+        changed = False
+        for position in positions:
+            if self._is_watched(position):
+                self._positions[position['id']] = position
+                changed = True
+        for position_id in removed_positions_ids:
+            changed = self._positions.pop(position_id, None) is not None or changed
+        if changed:
+            self._publish()
+
+    async def on_position_updated(self, instance_index, position):
+        if self._is_watched(position):
+            self._positions[position['id']] = position
+            self._publish()
+
+    async def on_position_removed(self, instance_index, position_id):
+        if self._positions.pop(position_id, None) is not None:
+            self._publish()
+
+
 class PositionTracker:
     def __init__(self):
-        self.connection = None
-        self.meta_api = None
+        self.shared = None
         self.is_initialized = False
         self.account_id = os.getenv('META_ACCOUNT_ID', '6e26b1d7-0c75-4a5d-ae1f-4059fb8e82f1')
         self.token = os.getenv('TOKEN') or os.getenv('META_API_KEY')
+        self.state_listener = AccountStateListener()
+        
+    @property
+    def connection(self):
+        """Streaming connection shared through the connection registry"""
+        return self.shared.connection if self.shared else None
+        
+    @property
+    def snapshot(self):
+        """Latest AccountSnapshot pushed by MetaAPI (O(1), safe from any thread)"""
+        return self.state_listener.snapshot
+        
+    def add_update_handler(self, handler):
+        """Register ``handler(snapshot)`` to be called whenever equity or positions change"""
+        self.state_listener.add_update_handler(handler)
+        
+    def watch_symbols(self, symbols):
+        """Track MT5 positions in the base assets of these exchange symbols (e.g. ETHUSDT -> ETH)"""
+        self.state_listener.watch_assets(base_asset(symbol) for symbol in symbols)
+        
+    def run_sync(self, coro, timeout=None):
+        """Run one of the tracker's coroutines on the shared MetaAPI loop from synchronous code"""
+        return run_sync(coro, timeout)
         
     async def initialize(self):
         """Initialize the MetaAPI connection if not already initialized"""
@@ -21,25 +208,15 @@ class PositionTracker:
             
         try:
             logger.info("Initializing MetaAPI connection")
-            self.meta_api = MetaApi(self.token)
-            account = await self.meta_api.metatrader_account_api.get_account(self.account_id)
-            
-            # Check if deployed
-            if account.state not in ['DEPLOYING', 'DEPLOYED']:
-                logger.info("Account not deployed, deploying now")
-                await account.deploy()
-                
-            # Connect to the account
-            logger.info("Waiting for MetaAPI to connect to broker")
-            await account.wait_connected()
-            
-            # Get streaming connection
-            self.connection = account.get_streaming_connection()
-            await self.connection.connect()
+            # Share the streaming connection (and its synchronization) with the rest of the process;
+            # the listener is registered before connecting so the initial synchronization is captured too
+            if not self.shared:
+                self.shared = connection_registry.acquire(self.account_id, self.token, listener=self.state_listener)
+            await self.shared.connect(wait_for_sync=True)
             
-            # Wait for synchronization
-            logger.info("Waiting for terminal state synchronization")
-            await self.connection.wait_synchronized()
+            # Another user may have synchronized the connection before we subscribed
+            if not self.state_listener.has_account_information and self.connection.terminal_state.account_information:
+                self.state_listener.load_terminal_state(self.connection.terminal_state)
             
             self.is_initialized = True
             logger.info("MetaAPI connection successfully initialized")
@@ -47,8 +224,8 @@ class PositionTracker:
             
         except Exception as e:
             logger.error(f"Error initializing MetaAPI connection: {e}")
-            if self.meta_api:
-                logger.error(self.meta_api.format_error(e))
+            if self.shared:
+                logger.error(self.shared.api.format_error(e))
             return False
     
     async def get_btc_positions(self):
@@ -59,12 +236,13 @@ class PositionTracker:
                 return []
                 
         try:
-            if self.connection and self.connection.terminal_state:
+            if self.state_listener.has_account_information:
+                # Kept current by the synchronization listener
+                return list(self.snapshot.positions)
+            elif self.connection and self.connection.terminal_state:
                 # Get positions from terminal state (more accurate than API call)
                 positions = self.connection.terminal_state.positions
-                btc_keywords = ['BTC', 'BITCOIN', 'XBT', 'BTCUSD', 'XBTUSD']
-                btc_positions = [p for p in positions if any(keyword in p['symbol'].upper() for keyword in btc_keywords)]
-                return btc_positions
+                return [p for p in positions if is_btc_position(p)]
             else:
                 logger.warning("Connection or terminal state not available")
                 return []
@@ -74,48 +252,9 @@ class PositionTracker:
     
     async def get_position_status(self):
         """Get the current BTC position status (Buy, Sell, or No Position)"""
-        positions = await self.get_btc_positions()
-        
-        if not positions:
-            return {
-                'status': 'No Position',
-                'color': '#999999',
-                'details': None
-            }
-            
-        # Get the first BTC position (assuming one position at a time)
-        position = positions[0]
-        
-        if position['type'] == 'POSITION_TYPE_BUY':
-            return {
-                'status': 'Buy',
-                'color': '#00aa00',  # Green for buy
-                'details': {
-                    'volume': position.get('volume', 0),
-                    'profit': position.get('profit', 0),
-                    'open_price': position.get('openPrice', 0),
-                    'symbol': position.get('symbol', ''),
-                    'time': position.get('time', 0),
-                    'comment': position.get('comment', ''),
-                    'swap': position.get('swap', 0),
-                    'margin_rate': position.get('marginRate', 0)
-                }
-            }
-        else:
-            return {
-                'status': 'Sell',
-                'color': '#aa0000',  # Red for sell
-                'details': {
-                    'volume': position.get('volume', 0),
-                    'profit': position.get('profit', 0),
-                    'open_price': position.get('openPrice', 0),
-                    'symbol': position.get('symbol', ''),
-                    'time': position.get('time', 0),
-                    'comment': position.get('comment', ''),
-                    'swap': position.get('swap', 0),
-                    'margin_rate': position.get('marginRate', 0)
-                }
-            }
+        if self.state_listener.has_account_information:
+            return self.snapshot.position_status
+        return describe_position(await self.get_btc_positions())
     
     async def get_account_information(self):
         """Get account information including balance and equity"""
@@ -125,7 +264,9 @@ class PositionTracker:
                 return None
                 
         try:
-            if self.connection and self.connection.terminal_state:
+            if self.state_listener.has_account_information:
+                return self.snapshot.account_information
+            elif self.connection and self.connection.terminal_state:
                 account_info = self.connection.terminal_state.account_information
                 return account_info
             else:
@@ -137,11 +278,14 @@ class PositionTracker:
             
     async def close_connection(self):
         """Close the MetaAPI connection properly"""
-        if self.connection:
+        if self.shared:
             try:
-                await self.connection.close()
-                logger.info("MetaAPI connection closed")
+                shared = self.shared
+                self.shared = None
                 self.is_initialized = False
+                # Only closes the connection if no one else is using it
+                await connection_registry.release(shared, listener=self.state_listener)
+                logger.info("MetaAPI connection released")
             except Exception as e:
                 logger.error(f"Error closing MetaAPI connection: {e}")
 
@@ -1,6 +1,5 @@
 import json
 import os
-import requests
 import plotly
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -9,6 +8,11 @@ from datetime import datetime, timedelta
 import math
 import random
 from dotenv import load_dotenv
+try:
+    from api.http_client import http_client
+except ImportError:
+    # Serverless entry points may run with api/ itself on the import path
+    from http_client import http_client
 
 # Load environment variables from .env file
 load_dotenv()
@@ -31,7 +35,7 @@ btc_position = "No Position"
 # Function to fetch BTC price
 def fetch_btc_price():
     try:
-        response = requests.get(BINANCE_API_URL)
+        response = http_client.get(BINANCE_API_URL)
         data = response.json()
         return float(data['price'])
     except Exception as e:
@@ -73,7 +77,7 @@ def fetch_historical_btc_data(timeframe='5h'):
     }
     
     try:
-        response = requests.get(BINANCE_KLINE_URL, params=params)
+        response = http_client.get(BINANCE_KLINE_URL, params=params)
         data = response.json()
         
         # Transform data to the format we need
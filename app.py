@@ -1,21 +1,30 @@
-import asyncio
 import time
 import json
+import numpy as np
 import pandas as pd
 import plotly
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import requests
 import threading
 import os
 import logging
+import tempfile
 from metaapi_cloud_sdk import MetaApi
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from db_handler import DatabaseHandler
+from live_buffer import RingBuffer, SharedRingBuffer, SharedSnapshot, TieredSeries
+from live_events import EventBroadcaster
+from live_link import LiveLinkClient
+from scheduler import Scheduler, COALESCE
+from backfill import KlineBackfiller
+from downsample import downsample, DOWNSAMPLE_METHODS
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from api.meta_api_streaming import MetaApiStreamingManager
-from api.position_tracker import position_tracker
+from api.position_tracker import position_tracker, base_asset
+from api.event_loop import metaapi_loop, run_sync
+from api.binance_feed import BinanceFeed
+from api.http_client import http_client
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,28 +32,97 @@ load_dotenv()
 # Credentials from environment variables
 BINANCE_API_URL = os.getenv('BINANCE_API_URL', 'https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT')
 
+# Basket of Binance symbols to collect; BTCUSDT drives the main chart and is always included
+SYMBOLS = [symbol.strip().upper() for symbol in os.getenv('SYMBOLS', 'BTCUSDT').split(',') if symbol.strip()]
+if 'BTCUSDT' not in SYMBOLS:
+    SYMBOLS.insert(0, 'BTCUSDT')
+EXTRA_SYMBOLS = [symbol for symbol in SYMBOLS if symbol != 'BTCUSDT']
+BINANCE_TICKER_URL = os.getenv('BINANCE_TICKER_URL', 'https://api.binance.com/api/v3/ticker/price')
+
+# Stream BTC prices over the Binance WebSocket instead of polling the REST ticker;
+# the REST ticker is still used whenever the stream is down or has gone stale
+BINANCE_STREAM = os.getenv('BINANCE_STREAM', 'true').lower() == 'true'
+BINANCE_STREAM_MAX_AGE = float(os.getenv('BINANCE_STREAM_MAX_AGE', 5))  # seconds
+
+# How this process takes part in ingestion:
+#   embedded  - collect in this process (python app.py or a single web worker)
+#   collector - run by collector.py, which owns ingestion and serves it on COLLECTOR_SOCKET
+#   external  - web worker only; follows the collector over COLLECTOR_SOCKET
+COLLECTOR_MODE = os.getenv('COLLECTOR_MODE', 'embedded').lower()
+COLLECTOR_SOCKET = os.getenv('COLLECTOR_SOCKET', os.path.join(tempfile.gettempdir(), 'crypto_dashboard_collector.sock'))
+COLLECTOR_SHM = os.getenv('COLLECTOR_SHM', 'crypto_dashboard')  # prefix of the shared memory segment names
+COLLECTOR_STALE_AFTER = 15  # seconds without a message (or heartbeat) before the collector counts as down
+INGESTING = COLLECTOR_MODE != 'external'
+
 # MetaAPI credentials from environment variables
 META_ACCOUNT_ID = os.getenv('META_ACCOUNT_ID')
 META_API_KEY = os.getenv('META_API_KEY')
 META_API_DOMAIN = os.getenv('META_API_DOMAIN', 'mt-api.cloud.agiliumtrade.ai')
 
-# Create a connection pool to reuse connections instead of creating new ones
-connection_pool = {}
-
 # Additional parameters that will be used for account configuration when deploying
 ACCOUNT_DEPLOY_OPTIONS = {
     'allocatedDedicatedIp': 'ipv4'  # Request a dedicated IPv4 address
 }
 
-# Data storage for real-time display
-btc_prices = []
-equity_values = []
-timestamps = []
+# Limit data history to reduce memory usage and improve performance
+MAX_DATA_POINTS = int(os.getenv('MAX_DATA_POINTS', 120))  # Store 2 minutes of data at 1-second intervals
+
+# Points per series in historical charts: the default, and the cap on ?points= / ?width=
+HISTORY_POINTS = int(os.getenv('HISTORY_POINTS', 2000))
+HISTORY_MAX_POINTS = int(os.getenv('HISTORY_MAX_POINTS', 5000))
+
+# Live-buffer column holding the price of a basket symbol other than BTC (e.g. 'ethusdt')
+def symbol_column(symbol):
+    return symbol.lower()
+
+SYMBOL_COLUMNS = tuple(symbol_column(symbol) for symbol in EXTRA_SYMBOLS)
+
+# Data storage for real-time display (fixed-size ring buffer, one row per sample of the basket).
+# The collector moves it, and the position state, into shared memory so every web worker reads
+# the same rows directly; workers attach to both when the live link connects.
+LIVE_COLUMNS = ('timestamp', 'btc_price', 'equity') + SYMBOL_COLUMNS
+live_data = RingBuffer(MAX_DATA_POINTS, columns=LIVE_COLUMNS)
+shared_state = None
+
+def create_shared_state():
+    global live_data, shared_state
+    live_data = SharedRingBuffer.create(f'{COLLECTOR_SHM}_live', MAX_DATA_POINTS, LIVE_COLUMNS)
+    shared_state = SharedSnapshot.create(f'{COLLECTOR_SHM}_state')
+
+# Snapshot for building a response. The seqlock only covers taking it, and a figure build can
+# outlast the next appends (by the collector, or the sampler in this process), so the rows are
+# copied; the live buffer holds only MAX_DATA_POINTS of them
+def read_live_snapshot():
+    return live_data.snapshot(copy=True)
+
+# Recent history kept in memory at 1s/10s/1m resolution, fed by the same loop
+history_tiers = TieredSeries(columns=('btc_price', 'equity') + SYMBOL_COLUMNS,
+                             ohlc_columns=('btc_price',) + SYMBOL_COLUMNS)
 btc_position = "No Position"
+btc_position_color = "#999999"
+btc_position_details = None
+
+# Push channel for /stream: the collector publishes each new point once for all clients
+live_events = EventBroadcaster()
+
+# Open /stream connections allowed per process. Each one holds a request thread for as
+# long as the page is open, so keep this below the server's threads (gunicorn --threads);
+# pages refused a stream poll /update-data instead
+STREAM_LIMIT = int(os.getenv('STREAM_LIMIT', 6))
+stream_slots = threading.BoundedSemaphore(STREAM_LIMIT)
 
 # Initialize database for historical data storage
 db_path = os.getenv('DB_PATH', 'crypto_dashboard.db')
-db = DatabaseHandler(db_path=db_path)
+db = DatabaseHandler(
+    db_path=db_path,
+    write_behind=INGESTING and os.getenv('DB_WRITE_BEHIND', 'true').lower() == 'true',
+    batch_size=int(os.getenv('DB_BATCH_SIZE', 500)),
+    flush_interval=float(os.getenv('DB_FLUSH_INTERVAL', 2.0)),
+    compact_schema=os.getenv('DB_COMPACT_SCHEMA', 'false').lower() == 'true',
+    partitioned=os.getenv('DB_PARTITIONED', 'false').lower() == 'true',
+    # Web workers only read; migrations, table creation and rollup fills belong to the ingesting process
+    readonly=not INGESTING
+)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -58,16 +136,52 @@ connecting_in_progress = False
 last_connection_attempt = 0
 CONNECTION_RETRY_INTERVAL = 30  # Only retry connections every 30 seconds
 
+# Push-based BTC price feed (started together with the data update thread)
+btc_feed = BinanceFeed(symbol='btcusdt') if BINANCE_STREAM and INGESTING else None
+
+# Fold every streamed price into the in-memory candles so moves between samples are kept;
+# stamped on receipt like sample_prices, since the exchange's event time is on another clock
+def on_streamed_price(price, timestamp, source):
+    history_tiers.append(time.time(), btc_price=price)
+
+if btc_feed is not None:
+    btc_feed.add_callback(on_streamed_price)
+
 # Function to fetch BTC price
 def fetch_btc_price():
+    # Prefer the latest streamed price; no HTTP round trip per tick
+    if btc_feed is not None:
+        price = btc_feed.get_price(max_age=BINANCE_STREAM_MAX_AGE)
+        if price is not None:
+            return price
+    
     try:
-        response = requests.get(BINANCE_API_URL)
+        response = http_client.get(BINANCE_API_URL)
         data = response.json()
         return float(data['price'])
     except Exception as e:
         print(f"Error fetching BTC price: {e}")
         return 0
 
+# Fetch the latest price of every basket symbol; all symbols the stream does not
+# cover come from one batch ticker request, so the cost barely grows with the basket
+def fetch_prices():
+    if not EXTRA_SYMBOLS:
+        return {'BTCUSDT': fetch_btc_price()}
+    
+    prices = {}
+    if btc_feed is not None:
+        price = btc_feed.get_price(max_age=BINANCE_STREAM_MAX_AGE)
+        if price is not None:
+            prices['BTCUSDT'] = price
+    
+    needed = [symbol for symbol in SYMBOLS if symbol not in prices]
+    response = http_client.get(BINANCE_TICKER_URL, params={'symbols': json.dumps(needed, separators=(',', ':'))})
+    response.raise_for_status()
+    for item in response.json():
+        prices[item['symbol']] = float(item['price'])
+    return prices
+
 # Function to check BTC position in MT5 using improved position tracker
 async def check_btc_position():
     try:
@@ -86,7 +200,7 @@ async def check_btc_position():
 
 # Function to fetch MT5 account equity using improved position tracker
 async def fetch_mt5_equity():
-    global btc_position
+    global btc_position, btc_position_color, btc_position_details
     
     try:
         # Get account information using enhanced position tracker
@@ -96,6 +210,8 @@ async def fetch_mt5_equity():
             # Check for BTC position
             position_data = await position_tracker.get_position_status()
             btc_position = position_data['status']
+            btc_position_color = position_data['color']
+            btc_position_details = position_data['details']
             
             # Log the account info for debugging
             logger.info(f"MT5 account equity: {account_info.get('equity', 0)}")
@@ -123,18 +239,8 @@ async def fetch_mt5_equity():
 # Initialize Flask app
 app = Flask(__name__)
 
-# Create a function to generate the plots
-def generate_plots():
-    # Create time labels for better readability
-    time_labels = [pd.Timestamp(ts, unit='s').strftime('%H:%M:%S') for ts in timestamps]
-    
-    # Check if we have valid data to plot
-    if not btc_prices or not equity_values or not timestamps:
-        # Create empty figure if no data
-        fig = make_subplots(rows=2, cols=1)
-        return fig
-    
-    # Calculate much tighter axis ranges to emphasize fluctuations
+# Calculate much tighter axis ranges to emphasize fluctuations
+def compute_axis_ranges(btc_prices, equity_values):
     if len(btc_prices) > 0:
         # Get the current price and create an extremely tight range around it (±0.2%)
         btc_mean = btc_prices[-1]  # Use latest price as center
@@ -147,10 +253,10 @@ def generate_plots():
         # Ensure min/max includes all data points from the last minute
         if len(btc_prices) > 30:  # If we have at least 30 seconds of data
             recent_btc = btc_prices[-30:]  # Look at last 30 seconds
-            if min(recent_btc) < btc_min:
-                btc_min = min(recent_btc) - 50
-            if max(recent_btc) > btc_max:
-                btc_max = max(recent_btc) + 50
+            if recent_btc.min() < btc_min:
+                btc_min = recent_btc.min() - 50
+            if recent_btc.max() > btc_max:
+                btc_max = recent_btc.max() + 50
     else:
         btc_min, btc_max = 77500, 79000  # Default tight range if no data
     
@@ -166,12 +272,33 @@ def generate_plots():
         # But make sure we don't miss any significant changes in the last minute
         if len(equity_values) > 24:  # If we have at least 1 minute of data (24 points at 2.5s each)
             recent_equity = equity_values[-24:]  # Last minute of data
-            if min(recent_equity) < eq_min:
-                eq_min = min(recent_equity) - 200
-            if max(recent_equity) > eq_max:
-                eq_max = max(recent_equity) + 200
+            if recent_equity.min() < eq_min:
+                eq_min = recent_equity.min() - 200
+            if recent_equity.max() > eq_max:
+                eq_max = recent_equity.max() + 200
     else:
         eq_min, eq_max = 9000, 12000  # Default range if no data
+    return btc_min, btc_max, eq_min, eq_max
+
+# Create a function to generate the plots
+def generate_plots(snapshot=None):
+    # Take a consistent view of the live series
+    if snapshot is None:
+        snapshot = read_live_snapshot()
+    timestamps = snapshot.data['timestamp']
+    btc_prices = snapshot.data['btc_price']
+    equity_values = snapshot.data['equity']
+    
+    # Check if we have valid data to plot
+    if not len(timestamps):
+        # Create empty figure if no data
+        fig = make_subplots(rows=2, cols=1)
+        return fig
+    
+    # Create time labels for better readability
+    time_labels = pd.to_datetime(timestamps, unit='s').strftime('%H:%M:%S')
+    
+    btc_min, btc_max, eq_min, eq_max = compute_axis_ranges(btc_prices, equity_values)
     
     # Create figure with subplots - using a larger height ratio for the BTC chart
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
@@ -262,44 +389,76 @@ def generate_plots():
 # Route for main page
 @app.route('/')
 def index():
-    return render_template('index.html', btc_position=btc_position)
+    return render_template('index.html', btc_position=position_state()['position'], max_points=MAX_DATA_POINTS)
 
 # Route for historical data view
 @app.route('/history')
 def history():
     return render_template('history.html')
 
+# Serialized live figure keyed on the live buffer's append count, so the figure
+# is built at most once per new tick however many clients are polling
+figure_cache = (-1, '{}')
+figure_cache_lock = threading.Lock()
+
+def get_figure_json():
+    """Return (version, figure JSON) for the current live data"""
+    global figure_cache
+    cached = figure_cache
+    if cached[0] == live_data.count:
+        return cached
+    
+    # Requests that miss on the same version wait here for a single build
+    with figure_cache_lock:
+        snapshot = read_live_snapshot()
+        if figure_cache[0] != snapshot.count:
+            graph = generate_plots(snapshot)
+            figure_cache = (snapshot.count, json.dumps(graph, cls=plotly.utils.PlotlyJSONEncoder))
+        return figure_cache
+
 # API endpoint for updating chart data
+# Clients pass ?since=<seq>&epoch=<epoch> (from their last response) to receive only the
+# points appended after it; without a usable cursor the full figure is returned.
 @app.route('/update-data')
 def update_data():
     try:
-        # Generate the plot data and position
-        graph = generate_plots()
-        graph_json = json.dumps(graph, cls=plotly.utils.PlotlyJSONEncoder)
+        snapshot = read_live_snapshot()
+        since = request.args.get('since', type=int)
+        epoch = request.args.get('epoch', type=int)
+        position = position_state()
         
-        # Get position details if available
-        position_details = None
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            position_data = loop.run_until_complete(position_tracker.get_position_status())
-            position = position_data['status']
-            position_color = position_data['color']
-            position_details = position_data['details']
-            loop.close()
-        except Exception as e:
-            logger.error(f"Error getting detailed position data: {e}")
-        
-        # Return the data as JSON with enhanced position information
-        return jsonify({
-            'graph': graph_json,
-            'position': position,
-            'position_color': position_color,
-            'position_details': position_details,
-            'btc_price': btc_prices[-1] if btc_prices else 0,
-            'equity': equity_values[-1] if equity_values else 0,
-            'timestamp': timestamps[-1] if timestamps else time.time()
-        })
+        response = {
+            'epoch': live_data.epoch,
+            'seq': snapshot.count,
+            'position': position['position'],
+            'position_color': position['position_color'],
+            'position_details': position['position_details'],
+            'btc_price': live_data.last('btc_price', 0),
+            'equity': live_data.last('equity', 0),
+            'timestamp': live_data.last('timestamp', time.time())
+        }
+        
+        # A cursor still inside the ring buffer gets just the new points; counts of
+        # an earlier buffer (before a collector or app restart) mean nothing here
+        new_points = snapshot.count - since if since is not None and epoch in (None, live_data.epoch) else -1
+        if 0 <= new_points <= len(snapshot.data['timestamp']) and since > 0:
+            btc_min, btc_max, eq_min, eq_max = compute_axis_ranges(snapshot.data['btc_price'], snapshot.data['equity'])
+            first = len(snapshot.data['timestamp']) - new_points
+            timestamps = snapshot.data['timestamp'][first:]
+            response.update({
+                'mode': 'delta',
+                'labels': list(pd.to_datetime(timestamps, unit='s').strftime('%H:%M:%S')),
+                'btc_prices': snapshot.data['btc_price'][first:].tolist(),
+                'equity_values': snapshot.data['equity'][first:].tolist(),
+                'btc_range': [btc_min, btc_max],
+                'equity_range': [eq_min, eq_max]
+            })
+            return jsonify(response)
+        
+        # Otherwise send a full snapshot of the figure
+        response['mode'] = 'full'
+        response['seq'], response['graph'] = get_figure_json()
+        return jsonify(response)
     except Exception as e:
         logger.error(f"Error in update_data: {e}")
         return jsonify({
@@ -310,11 +469,174 @@ def update_data():
             'position_details': None
         })
 
+# Browser events go to this process's /stream clients; the collector sends them over
+# the live link instead, and every web worker relays them under the same ids
+def publish_event(event_type, data):
+    if COLLECTOR_MODE == 'collector':
+        if live_link is not None:
+            live_link.publish(event_type, data)
+    else:
+        live_events.publish(event_type, data)
+
+# Push a new live point (and any position change) to /stream subscribers.
+# 'seq' and 'epoch' number the point like /update-data does, so a client that sees
+# a gap can fetch the missed points with ?since=
+def publish_tick(sample_time, btc_price, equity, symbol_prices=None):
+    snapshot = live_data.snapshot()
+    btc_min, btc_max, eq_min, eq_max = compute_axis_ranges(snapshot.data['btc_price'], snapshot.data['equity'])
+    publish_event('tick', {
+        'epoch': live_data.epoch,
+        'seq': snapshot.count,
+        'timestamp': sample_time,
+        'label': time.strftime('%H:%M:%S', time.gmtime(sample_time)),
+        'btc_price': btc_price,
+        'equity': equity,
+        'symbols': symbol_prices or {},
+        'btc_range': [btc_min, btc_max],
+        'equity_range': [eq_min, eq_max]
+    })
+    publish_position()
+
+def publish_position():
+    global last_published_position, last_shared_position
+    state = position_state()
+    position = (state['position'], state['position_color'], state['position_details'])
+    if position != last_published_position:
+        last_published_position = position
+        publish_event('position', {
+            'position': state['position'],
+            'position_color': state['position_color'],
+            'position_details': state['position_details']
+        })
+    
+    # Share the whole state (with the per-asset status for /symbols) with the web workers
+    if COLLECTOR_MODE == 'collector' and shared_state is not None and state != last_shared_position:
+        try:
+            shared_state.write(state)
+        except ValueError as e:
+            # Not remembered, so the next check tries again
+            logger.error(f"Error sharing position state: {e}")
+            return
+        last_shared_position = state
+
+last_published_position = None
+last_shared_position = None
+
+# LiveLinkServer set by collector.py; every tick, equity and position event and stats update goes to the web workers
+live_link = None
+
+# Latest ingestion stats pushed by the collector in external mode
+collector_stats_cache = {}
+
+NO_POSITION_STATE = {
+    'position': 'No Position',
+    'position_color': '#999999',
+    'position_details': None,
+    'asset_status': {}
+}
+
+# Current position; web workers read the collector's copy from shared memory
+def position_state():
+    if not INGESTING:
+        return shared_state.read(NO_POSITION_STATE) if shared_state is not None else NO_POSITION_STATE
+    return {
+        'position': btc_position,
+        'position_color': btc_position_color,
+        'position_details': btc_position_details,
+        'asset_status': position_tracker.snapshot.asset_status
+    }
+
+def current_asset_status():
+    if INGESTING:
+        return position_tracker.snapshot.asset_status
+    return position_state()['asset_status']
+
+# Stats of the process that does the ingestion (this one, or the collector in external mode)
+def ingestion_stats(name, local):
+    if INGESTING:
+        return local()
+    return collector_stats_cache.get(name, {})
+
+# Called on the MetaAPI loop thread whenever the synchronization listener sees
+# an account or position change, so equity and position changes reach clients immediately
+def on_account_update(snapshot):
+    global btc_position, btc_position_color, btc_position_details, last_pushed_equity
+    status = snapshot.position_status
+    btc_position = status['status']
+    btc_position_color = status['color']
+    btc_position_details = status['details']
+    publish_position()
+    
+    # The insert only joins the write-behind queue, so the MetaAPI loop is not held up by SQLite
+    if snapshot.equity is not None and snapshot.equity != last_pushed_equity:
+        last_pushed_equity = snapshot.equity
+        record_equity(snapshot.equity)
+
+position_tracker.add_update_handler(on_account_update)
+position_tracker.watch_symbols(SYMBOLS)
+
+# Server-Sent Events stream of live ticks; replaces per-second polling of /update-data
+@app.route('/stream')
+def stream():
+    last_event_id = request.headers.get('Last-Event-ID')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    # Leave threads free for /update-data and /historical-data; EventSource gives up on a 503
+    if not stream_slots.acquire(blocking=False):
+        return Response('Too many live streams, poll /update-data instead', status=503, mimetype='text/plain')
+    response = Response(live_events.stream(last_event_id=last_event_id),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(stream_slots.release)
+    return response
+
+# API endpoint for database writer health (queue depth, batch sizes)
+@app.route('/db-stats')
+def db_stats():
+    return jsonify(ingestion_stats('db', db.get_writer_stats))
+
+# API endpoint for outbound HTTP latency and error counts per host
+@app.route('/http-stats')
+def http_stats():
+    return jsonify(ingestion_stats('http', http_client.get_stats))
+
+# API endpoint for the shared MetaAPI connection state (connecting/synchronized/degraded, backoff)
+@app.route('/connection-health')
+def connection_health():
+    return jsonify(ingestion_stats('connection', meta_api_streaming.health))
+
+# Points to keep per historical series: ?points=, or two per pixel of ?width= (a low and a high per column)
+def history_point_budget():
+    points = request.args.get('points', type=int)
+    if points is None:
+        width = request.args.get('width', type=int)
+        points = width * 2 if width else HISTORY_POINTS
+    return max(3, min(points, HISTORY_MAX_POINTS))
+
+# A (timestamp, value) series reduced to the point budget, as a DataFrame with datetime timestamps
+def history_frame(timestamps, values, column, points, method):
+    timestamps, values = downsample(timestamps, values, points, method)
+    return pd.DataFrame({'timestamp': pd.to_datetime(timestamps, unit='s'), column: values})
+
+# Timestamp and value arrays of (timestamp, value, ...) rows from the database
+def series_columns(rows):
+    data = np.array([row[:2] for row in rows], dtype=np.float64).reshape(-1, 2)
+    return data[:, 0], data[:, 1]
+
 # API endpoint for getting historical data
+# Line series are downsampled to ?points= (or 2 x ?width=) points with ?downsample=lttb|minmax,
+# so even the 7 day window returns a few thousand points per trace
 @app.route('/historical-data')
 def historical_data():
     timeframe = request.args.get('timeframe', '5')
     chart_type = request.args.get('type', 'line')
+    points = history_point_budget()
+    method = request.args.get('downsample', 'lttb')
+    if method not in DOWNSAMPLE_METHODS:
+        method = 'lttb'
     
     try:
         timeframe_hours = int(timeframe)
@@ -325,41 +647,38 @@ def historical_data():
     end_time = datetime.now()
     start_time = end_time - timedelta(hours=timeframe_hours)
     
+    # Short timeframes are answered from the in-memory tiers when they cover the whole window
+    memory_window = None
+    if timeframe_hours * 3600 <= history_tiers.max_span:
+        memory_window = history_tiers.window(timeframe_hours * 3600, now=end_time.timestamp(),
+                                             require_full=True)
+    
     try:
         if chart_type == 'candlestick':
             # Get OHLC data for candlestick chart
             interval_min = int(request.args.get('interval', '15'))
             
-            # Retrieve BTC price data from database
-            btc_data = db.get_btc_prices(start_time, end_time)
+            if memory_window is not None:
+                # Build candles from the in-memory buckets
+                candles = TieredSeries.candles(memory_window, interval_min * 60, 'btc_price')
+            else:
+                # Aggregate candles in SQLite (from the rollup tables where possible)
+                candles = db.get_btc_candles(start_time, end_time, interval_minutes=interval_min)
             
-            if not btc_data:
+            if not len(candles['timestamp']):
                 return jsonify({'error': 'No BTC price data available for the selected timeframe.'})
             
-            # Convert to DataFrame
-            df = pd.DataFrame(btc_data, columns=['timestamp', 'price'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df.set_index('timestamp', inplace=True)
-            
-            # Resample to the specified interval and create OHLC data
-            ohlc = df.resample(f'{interval_min}min').agg({
-                'price': ['first', 'max', 'min', 'last']
-            })
-            
-            ohlc.columns = ['open', 'high', 'low', 'close']
-            ohlc.reset_index(inplace=True)
-            
             # Create candlestick chart
             fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, 
                                 row_heights=[0.7, 0.3])
             
             fig.add_trace(
                 go.Candlestick(
-                    x=ohlc['timestamp'],
-                    open=ohlc['open'],
-                    high=ohlc['high'],
-                    low=ohlc['low'],
-                    close=ohlc['close'],
+                    x=pd.to_datetime(candles['timestamp'], unit='s'),
+                    open=candles['open'],
+                    high=candles['high'],
+                    low=candles['low'],
+                    close=candles['close'],
                     name='BTC/USDT',
                     increasing_line_color='#26A69A', 
                     decreasing_line_color='#EF5350'
@@ -367,12 +686,30 @@ def historical_data():
                 row=1, col=1
             )
             
-            # Get MT5 equity data for the same timeframe
-            mt5_data = db.get_mt5_equity(start_time, end_time)
+            # Get MT5 equity data for the same timeframe; from the database it is aggregated
+            # per candle, drawn at its last value with the candle's min-max range shaded
+            equity_range = None
+            if memory_window is not None:
+                mt5_df = history_frame(memory_window['timestamp'], memory_window['equity'], 'equity', points, method)
+            else:
+                equity = db.aggregate_ticks('mt5_equity', start_time, end_time, interval_min * 60)
+                mt5_df = pd.DataFrame({'timestamp': pd.to_datetime(equity['timestamp'], unit='s'),
+                                       'equity': equity['close']})
+                equity_range = (equity['low'], equity['high'])
             
-            if mt5_data:
-                mt5_df = pd.DataFrame(mt5_data, columns=['timestamp', 'equity', 'position'])
-                mt5_df['timestamp'] = pd.to_datetime(mt5_df['timestamp'])
+            if len(mt5_df):
+                if equity_range is not None:
+                    fig.add_trace(
+                        go.Scatter(x=mt5_df['timestamp'], y=equity_range[1], mode='lines',
+                                   line=dict(width=0), showlegend=False, hoverinfo='skip'),
+                        row=2, col=1
+                    )
+                    fig.add_trace(
+                        go.Scatter(x=mt5_df['timestamp'], y=equity_range[0], mode='lines',
+                                   line=dict(width=0), fill='tonexty', fillcolor='rgba(0, 169, 242, 0.2)',
+                                   name='Equity Range', hoverinfo='skip'),
+                        row=2, col=1
+                    )
                 
                 # Add MT5 equity line to the subplot
                 fig.add_trace(
@@ -421,16 +758,19 @@ def historical_data():
             )
             
         else:  # Line chart
-            # Retrieve data from database
-            btc_data = db.get_btc_prices(start_time, end_time)
-            mt5_data = db.get_mt5_equity(start_time, end_time)
+            # Retrieve data from memory or the database
+            if memory_window is not None:
+                btc_series = (memory_window['timestamp'], memory_window['btc_price'])
+                mt5_series = (memory_window['timestamp'], memory_window['equity'])
+            else:
+                btc_series = series_columns(db.get_btc_prices(start_time, end_time))
+                mt5_series = series_columns(db.get_mt5_equity(start_time, end_time))
             
-            if not btc_data:
+            if not len(btc_series[0]):
                 return jsonify({'error': 'No BTC price data available for the selected timeframe.'})
             
-            # Create DataFrames
-            btc_df = pd.DataFrame(btc_data, columns=['timestamp', 'price'])
-            btc_df['timestamp'] = pd.to_datetime(btc_df['timestamp'])
+            # Create DataFrames, downsampled to the point budget
+            btc_df = history_frame(*btc_series, 'price', points, method)
             
             # Create figure with two subplots sharing x-axis
             fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, 
@@ -451,9 +791,8 @@ def historical_data():
             )
             
             # Add MT5 equity trace if available
-            if mt5_data:
-                mt5_df = pd.DataFrame(mt5_data, columns=['timestamp', 'equity', 'position'])
-                mt5_df['timestamp'] = pd.to_datetime(mt5_df['timestamp'])
+            if len(mt5_series[0]):
+                mt5_df = history_frame(*mt5_series, 'equity', points, method)
                 
                 fig.add_trace(
                     go.Scatter(
@@ -681,7 +1020,7 @@ with open('templates/index.html', 'w', encoding='utf-8') as f:
         .nav-link:hover {
             background-color: #2a2a2a;
         }
-        #position-indicator {
+        #position-indicator, #equity-indicator {
             font-size: 24px;
             font-weight: bold;
             margin: 20px 0;
@@ -717,166 +1056,399 @@ with open('templates/index.html', 'w', encoding='utf-8') as f:
             <div id="plotly-chart"></div>
         </div>
         <div id="position-indicator">BTC Position: {{ btc_position }}</div>
+        <div id="equity-indicator">MT5 Equity: -</div>
         <div id="status-message">Connected to MetaAPI using real account data (Deepanshu Goyal - GTCGlobalTrade)</div>
     </div>
 
     <script>
         let chart;
         let firstLoad = true;
+        let lastSeq = null;
+        let lastEpoch = null;
+        let updating = false;
+        const maxPoints = {{ max_points }};
         
-        // Function to update the chart
+        // Apply position updates from either /update-data or the event stream
+        function updatePosition(data) {
+            $('#position-indicator').text('BTC Position: ' + data.position);
+            $('#position-indicator').css('color', data.position_color);
+        }
+        
+        function updateEquity(equity) {
+            $('#equity-indicator').text('MT5 Equity: $' + Number(equity).toLocaleString(undefined, {maximumFractionDigits: 2}));
+        }
+        
+        // Append new points to the existing traces instead of redrawing the figure
+        function appendPoints(labels, btcPrices, equityValues, btcRange, equityRange) {
+            if (labels.length) {
+                Plotly.extendTraces('plotly-chart', {
+                    x: [labels, labels],
+                    y: [btcPrices, equityValues]
+                }, [0, 1], maxPoints);
+            }
+            Plotly.relayout('plotly-chart', {
+                'yaxis.range': btcRange,
+                'yaxis2.range': equityRange
+            });
+        }
+        
+        // Function to update the chart; after the first load only new points are requested
         function updateChart() {
             $('#status-message').html('Updating data <span class="loading">•••</span>');
-            $.getJSON('/update-data', function(data) {
-                // Use newPlot only on first load, then update instead for better performance
-                if (firstLoad) {
-                    chart = JSON.parse(data.graph);
-                    Plotly.newPlot('plotly-chart', chart);
-                    firstLoad = false;
-                } else {
-                    try {
-                        // Parse the new chart data
-                        const chartData = JSON.parse(data.graph);
-                        
-                        // Create a more robust update with explicit data points
-                        const updateData = {
-                            x: [[...chartData.data[0].x], [...chartData.data[1].x]],
-                            y: [[...chartData.data[0].y], [...chartData.data[1].y]]
-                        };
-                        
-                        // Update the plot with new data
-                        Plotly.update('plotly-chart', updateData);
-                    } catch (e) {
-                        console.error('Error updating chart:', e);
-                        // Fall back to complete redraw if update fails
+            const params = (firstLoad || lastSeq === null) ? {} : {since: lastSeq, epoch: lastEpoch};
+            updating = true;
+            $.getJSON('/update-data', params, function(data) {
+                if (data.error) {
+                    $('#status-message').html('Error updating data. Will try again in 1 second.');
+                    return;
+                }
+                
+                try {
+                    if (data.mode === 'delta' && !firstLoad) {
+                        appendPoints(data.labels, data.btc_prices, data.equity_values,
+                                     data.btc_range, data.equity_range);
+                    } else {
+                        // Full snapshot: first load, or our cursor fell out of the server's buffer
                         chart = JSON.parse(data.graph);
                         Plotly.newPlot('plotly-chart', chart);
+                        firstLoad = false;
                     }
+                    lastSeq = data.seq;
+                    lastEpoch = data.epoch;
+                } catch (e) {
+                    console.error('Error updating chart:', e);
+                    // Request a full snapshot next time
+                    lastSeq = null;
                 }
                 
-                $('#position-indicator').text('BTC Position: ' + data.position);
-                $('#position-indicator').css('color', data.position_color);
+                updatePosition(data);
+                updateEquity(data.equity);
                 $('#status-message').html('Connected to MetaAPI - BTC updates every 1s, MT5 updates every 2.5s');
             })
             .fail(function() {
                 $('#status-message').html('Error updating data. Will try again in 1 second.');
+            })
+            .always(function() {
+                updating = false;
             });
         }
 
         // Initial chart load
         updateChart();
 
-        // Update every 1 second
-        setInterval(updateChart, 1000);
+        if (window.EventSource) {
+            // Live updates are pushed by the server; EventSource reconnects on its own
+            const source = new EventSource('/stream');
+            source.addEventListener('tick', function(event) {
+                const tick = JSON.parse(event.data);
+                // The first load or a catch-up request in flight already covers this tick
+                if (firstLoad || updating) {
+                    return;
+                }
+                if (tick.epoch !== lastEpoch) {
+                    // The live buffer was recreated (collector or app restart) and counts from 0 again
+                    lastSeq = null;
+                    updateChart();
+                    return;
+                }
+                if (lastSeq !== null && tick.seq <= lastSeq) {
+                    return;
+                }
+                if (lastSeq !== null && tick.seq === lastSeq + 1) {
+                    appendPoints([tick.label], [tick.btc_price], [tick.equity],
+                                 tick.btc_range, tick.equity_range);
+                    lastSeq = tick.seq;
+                } else {
+                    // Ticks were missed (stream dropped or fell behind): fetch them as a delta
+                    updateChart();
+                }
+            });
+            source.addEventListener('position', function(event) {
+                updatePosition(JSON.parse(event.data));
+            });
+            source.addEventListener('equity', function(event) {
+                updateEquity(JSON.parse(event.data).equity);
+            });
+            source.onopen = function() {
+                $('#status-message').html('Connected to MetaAPI - live updates streaming');
+            };
+            source.onerror = function() {
+                if (source.readyState === EventSource.CLOSED) {
+                    // The server turned the stream away (all stream slots busy): poll instead
+                    $('#status-message').html('Live stream unavailable - polling for updates');
+                    setInterval(updateChart, 1000);
+                } else {
+                    $('#status-message').html('Live stream interrupted. Reconnecting...');
+                }
+            };
+        } else {
+            // Browsers without EventSource fall back to polling every 1 second
+            setInterval(updateChart, 1000);
+        }
     </script>
 </body>
 </html>
 ''')
 
-# Function to update the data every 10 seconds
+# Collector jobs, run independently by the scheduler on drift-free deadlines
 # Variables to control update frequencies from environment variables
 BTC_UPDATE_INTERVAL = float(os.getenv('BTC_UPDATE_INTERVAL', 1))  # Update BTC price every 1 second
 MT5_UPDATE_INTERVAL = float(os.getenv('MT5_UPDATE_INTERVAL', 2.5))  # Update MT5 equity every 2.5 seconds
-last_mt5_update = 0
+RETENTION_INTERVAL = 86400  # Clean old data once a day
+CONNECTION_CHECK_INTERVAL = 300  # Check the MetaAPI connection every 5 minutes
 
-# Limit data history to reduce memory usage and improve performance
-MAX_DATA_POINTS = int(os.getenv('MAX_DATA_POINTS', 120))  # Store 2 minutes of data at 1-second intervals
+# Fill holes in the stored BTC ticks (restarts, stalls) from Binance klines
+BACKFILL = os.getenv('BACKFILL', 'true').lower() == 'true'
+BACKFILL_INTERVAL = float(os.getenv('BACKFILL_INTERVAL', 900))  # Rescan for gaps every 15 minutes
+BACKFILL_STARTUP_DELAY = 10  # Let the first samples land so the restart gap has both ends
+BACKFILL_MIN_GAP = float(os.getenv('BACKFILL_MIN_GAP', 90))  # seconds
+latest_equity = None
+last_pushed_equity = None
+
+# Log an error only when it differs from the last one logged for the same job
+def log_job_error(job, message, error):
+    if getattr(log_job_error, job, '') != str(error):
+        logger.error(f"{message}: {error}")
+        setattr(log_job_error, job, str(error))
 
-def update_data_periodically():
-    global btc_prices, equity_values, timestamps, btc_position, last_mt5_update
+# Equity for the next sample: the listener's pushed value, else the last polled one
+def current_equity():
+    account = position_tracker.snapshot
+    if account.equity is not None:
+        return account.equity
+    if latest_equity is not None:
+        return latest_equity
+    return live_data.last('equity', 0)
+
+def sample_prices():
+    try:
+        prices = fetch_prices()
+        
+        # Store the prices in the database for historical data
+        try:
+            db.save_prices(prices)
+        except Exception as db_e:
+            logger.error(f"Error saving prices to database: {db_e}")
+    except Exception as e:
+        log_job_error('prices', "Error fetching prices", e)
+        prices = {}
     
-    # Initialize MetaAPI streaming on startup
+    btc_price = prices.get('BTCUSDT', live_data.last('btc_price', 0))
+    symbol_prices = {symbol_column(symbol): prices[symbol] for symbol in EXTRA_SYMBOLS if symbol in prices}
+    equity = current_equity()
+    
+    # Add the row to the ring buffer; the oldest row is overwritten once it is full
+    # (symbols missing from this sample repeat their previous value)
+    sample_time = time.time()
+    live_data.append(timestamp=sample_time, btc_price=btc_price, equity=equity, **symbol_prices)
+    history_tiers.append(sample_time, btc_price=btc_price, equity=equity, **symbol_prices)
+    
+    # Push the new point to every /stream client
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(meta_api_streaming.connect_streaming(wait_for_sync=False))
-        logger.info("MetaAPI streaming initialized on startup")
+        publish_tick(sample_time, btc_price, equity, symbol_prices)
     except Exception as e:
-        logger.error(f"Error initializing MetaAPI streaming on startup: {e}")
+        logger.error(f"Error publishing live event: {e}")
+
+# Push a new equity value to clients and store it
+def record_equity(equity):
+    publish_event('equity', {'timestamp': time.time(), 'equity': equity})
     
-    while True:
-        current_time = time.time()
+    # Store MT5 equity in database for historical data
+    try:
+        db.save_mt5_equity(equity, btc_position)
+    except Exception as db_e:
+        logger.error(f"Error saving MT5 equity to database: {db_e}")
+
+def sample_mt5():
+    global latest_equity
+    
+    # Once the account has synchronized, the listener pushes every equity change (on_account_update)
+    if position_tracker.snapshot.equity is not None:
+        return
+    
+    # Until then poll MT5 equity on the shared MetaAPI loop, with timeout to prevent hanging
+    try:
+        equity = run_sync(fetch_mt5_equity(), timeout=30)
+        logger.info(f"Updated MT5 equity at {time.strftime('%H:%M:%S', time.localtime())}")
+    except Exception as e:
+        log_job_error('mt5', "Error in MT5 update job", e)
+        return
+    latest_equity = equity
+    record_equity(equity)
+
+def clean_old_data():
+    try:
+        deleted_btc, deleted_mt5 = db.clean_old_data(max_days=7)
+        if deleted_btc > 0 or deleted_mt5 > 0:
+            logger.info(f"Cleaned old data: {deleted_btc} BTC records, {deleted_mt5} MT5 records")
+    except Exception as e:
+        logger.error(f"Error cleaning old data: {e}")
+
+backfiller = KlineBackfiller(db, min_gap=BACKFILL_MIN_GAP, lookback_hours=7 * 24)
+
+def backfill_gaps():
+    try:
+        stored = backfiller.run()
+        if stored > 0:
+            logger.info(f"Backfilled {stored} BTC candles from Binance klines")
+    except Exception as e:
+        logger.error(f"Error backfilling BTC gaps: {e}")
+
+def check_metaapi_connection():
+    try:
+        meta_api_streaming.run_sync(meta_api_streaming.connect_streaming(wait_for_sync=False), timeout=60)
+        logger.info("Checked MetaAPI streaming connection")
+    except Exception as e:
+        log_job_error('connection', "Error checking MetaAPI streaming connection", e)
+
+# Every job has its own thread, so a slow MT5 call, reconnect or rate-limited backfill never
+# delays price sampling; the connection check also runs at startup, replacing the blocking
+# connect before the loop
+collector = Scheduler()
+collector.add_job('price_sample', sample_prices, BTC_UPDATE_INTERVAL)
+collector.add_job('mt5_sample', sample_mt5, MT5_UPDATE_INTERVAL)
+collector.add_job('retention', clean_old_data, RETENTION_INTERVAL, first_delay=60)
+collector.add_job('metaapi_connection', check_metaapi_connection, CONNECTION_CHECK_INTERVAL, overrun=COALESCE)
+if BACKFILL:
+    collector.add_job('backfill', backfill_gaps, BACKFILL_INTERVAL, first_delay=BACKFILL_STARTUP_DELAY)
+
+# API endpoint for the latest price and MT5 position of every basket symbol
+@app.route('/symbols')
+def symbols():
+    asset_status = current_asset_status()
+    result = {}
+    for symbol in SYMBOLS:
+        column = 'btc_price' if symbol == 'BTCUSDT' else symbol_column(symbol)
+        result[symbol] = {
+            'price': live_data.last(column, None),
+            'position': asset_status.get(base_asset(symbol))
+        }
+    return jsonify({'timestamp': live_data.last('timestamp', None), 'symbols': result})
+
+# API endpoint for collector job statistics (runs, overruns, missed ticks, durations)
+@app.route('/collector-stats')
+def collector_stats():
+    stats = ingestion_stats('collector', collector.get_stats)
+    if collector_link is not None:
+        link = collector_link.get_stats()
+        # The collector heartbeats every few seconds, so silence means it is gone or hung
+        alive = link['connected'] and link['age'] is not None and link['age'] < COLLECTOR_STALE_AFTER
+        stats = dict(stats, live_link=link, collector_alive=alive)
+    else:
+        stats = dict(stats, collector_alive=True)
+    last_sample = live_data.last('timestamp', None)
+    stats['last_sample_age'] = time.time() - last_sample if last_sample else None
+    return jsonify(stats)
+
+# API endpoint for gap backfill statistics (gaps filled, candles, Binance weight used)
+@app.route('/backfill-stats')
+def backfill_stats():
+    return jsonify(ingestion_stats('backfill', backfiller.get_stats))
+
+# Sent to each web worker when it connects: where the shared state lives, and the latest stats
+def live_state_snapshot():
+    return {
+        'epoch': live_data.epoch,
+        'seq': live_data.count,
+        'live_segment': live_data.name,
+        'state_segment': shared_state.name,
+        'stats': ingestion_stats_snapshot()
+    }
+
+def ingestion_stats_snapshot():
+    return {
+        'db': db.get_writer_stats(),
+        'http': http_client.get_stats(),
+        'connection': meta_api_streaming.health(),
+        'collector': collector.get_stats(),
+        'backfill': backfiller.get_stats()
+    }
+
+def publish_link_stats():
+    if live_link is not None:
+        live_link.publish('stats', ingestion_stats_snapshot())
+
+# Web worker side of the live link. /update-data reads the collector's shared buffer
+# directly, so every worker answers ?since= cursors the same way; link events are
+# relayed to this worker's /stream clients and feed its in-memory history. After a
+# reconnect the link replays what was missed, and browsers fetch any ticks that
+# are still missing through ?since=, so nothing needs re-publishing here.
+# Segments replaced by a relink, with the time they were replaced; requests started before
+# the relink may still be reading them, so they are unmapped only after a grace period
+retired_segments = []
+RETIRED_SEGMENT_GRACE = 60  # seconds
+
+def close_retired_segments():
+    now = time.time()
+    for entry in list(retired_segments):
+        retired_at, handle = entry
+        if now - retired_at >= RETIRED_SEGMENT_GRACE and handle.close():
+            retired_segments.remove(entry)
+
+def apply_collector_snapshot(state):
+    global live_data, shared_state, figure_cache
+    # (Re)attach on every connect: a restarted collector creates new segments
+    previous = [handle for handle in (live_data, shared_state) if isinstance(handle, (SharedRingBuffer, SharedSnapshot))]
+    live_data = SharedRingBuffer.attach(state['live_segment'])
+    shared_state = SharedSnapshot.attach(state['state_segment'])
+    retired_segments.extend((time.time(), handle) for handle in previous)
+    close_retired_segments()
+    with figure_cache_lock:
+        figure_cache = (-1, '{}')
+    collector_stats_cache.update(state['stats'])
+    logger.info(f"Attached to collector shared memory at sample {state['seq']} (epoch {state['epoch']})")
+
+def apply_collector_event(event_type, data, event_id):
+    if event_type == 'stats':
+        collector_stats_cache.update(data)
+        # Stats arrive periodically; a good moment to unmap segments of an earlier collector
+        close_retired_segments()
+        return True
+    if event_type == 'tick':
+        history_tiers.append(data['timestamp'], btc_price=data['btc_price'], equity=data['equity'], **data['symbols'])
+    # Same id as on every other worker, so a browser's Last-Event-ID is valid whichever one it reaches
+    live_events.publish(event_type, data, event_id=event_id)
+    return True
+
+collector_link = LiveLinkClient(COLLECTOR_SOCKET, apply_collector_snapshot, apply_collector_event) \
+    if COLLECTOR_MODE == 'external' else None
+
+def start_collector():
+    collector.start()
+    if btc_feed is not None:
+        btc_feed.start()
+
+def stop_collector(wait=True):
+    collector.stop(wait=wait)
+    if btc_feed is not None:
+        btc_feed.stop()
+
+def initialize_position_tracker():
+    try:
+        logger.info("Initializing position tracker on startup...")
+        position_tracker.run_sync(position_tracker.initialize())
+        logger.info("Position tracker initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize position tracker: {e}")
+
+def close_metaapi_connections():
+    logger.info("Cleaning up MetaAPI connections...")
+    try:
+        # Close both MetaAPI connections on the loop that opened them
+        meta_api_streaming.run_sync(meta_api_streaming.close_connection(), timeout=10)
+        position_tracker.run_sync(position_tracker.close_connection(), timeout=10)
         
-        # Fetch BTC price (update every second)
-        try:
-            btc_price = fetch_btc_price()
-            btc_prices.append(btc_price)
-            
-            # Store BTC price in database for historical data
-            try:
-                db.save_btc_price(btc_price)
-            except Exception as db_e:
-                logger.error(f"Error saving BTC price to database: {db_e}")
-        except Exception as e:
-            if not getattr(update_data_periodically, 'last_btc_error', '') == str(e):
-                logger.error(f"Error fetching BTC price: {e}")
-                update_data_periodically.last_btc_error = str(e)
-            btc_prices.append(btc_prices[-1] if btc_prices else 0)
-        
-        # Fetch MT5 equity (only update on the specified interval)
-        if current_time - last_mt5_update >= MT5_UPDATE_INTERVAL:
-            try:
-                # Use existing event loop if available
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                # Run with timeout to prevent hanging
-                equity = loop.run_until_complete(asyncio.wait_for(fetch_mt5_equity(), timeout=30))
-                equity_values.append(equity)
-                last_mt5_update = current_time
-                logger.info(f"Updated MT5 equity at {time.strftime('%H:%M:%S', time.localtime())}")
-                
-                # Store MT5 equity in database for historical data
-                try:
-                    db.save_mt5_equity(equity, btc_position)
-                except Exception as db_e:
-                    logger.error(f"Error saving MT5 equity to database: {db_e}")
-            except Exception as e:
-                if not getattr(update_data_periodically, 'last_mt5_error', '') == str(e):
-                    logger.error(f"Error in MT5 update thread: {e}")
-                    update_data_periodically.last_mt5_error = str(e)
-                equity_values.append(equity_values[-1] if equity_values else 0)
-        else:
-            # If not time to update MT5 yet, just use the last value
-            equity_values.append(equity_values[-1] if equity_values else 0)
-        
-        # Add timestamp
-        timestamps.append(time.time())
-        
-        # Limit data points to reduce memory usage
-        if len(btc_prices) > MAX_DATA_POINTS:
-            btc_prices = btc_prices[-MAX_DATA_POINTS:]
-            equity_values = equity_values[-MAX_DATA_POINTS:]
-            timestamps = timestamps[-MAX_DATA_POINTS:]
-        
-        # Periodically clean old data from database (once a day)
-        if current_time % 86400 < BTC_UPDATE_INTERVAL:  # Once every ~24 hours
-            try:
-                deleted_btc, deleted_mt5 = db.clean_old_data(max_days=7)
-                if deleted_btc > 0 or deleted_mt5 > 0:
-                    logger.info(f"Cleaned old data: {deleted_btc} BTC records, {deleted_mt5} MT5 records")
-            except Exception as e:
-                logger.error(f"Error cleaning old data: {e}")
-        
-        # Periodically check MetaAPI connection (every 5 minutes)
-        if current_time % 300 < BTC_UPDATE_INTERVAL:
-            try:
-                loop = asyncio.get_event_loop()
-                loop.run_until_complete(meta_api_streaming.connect_streaming(wait_for_sync=False))
-                logger.info("Checked MetaAPI streaming connection")
-            except Exception as e:
-                logger.error(f"Error checking MetaAPI streaming connection: {e}")
-        
-        # Sleep for BTC update interval
-        time.sleep(BTC_UPDATE_INTERVAL)
-
-# Start the data update thread
-import threading
-data_thread = threading.Thread(target=update_data_periodically, daemon=True)
-data_thread.start()
+        logger.info("All MetaAPI connections closed")
+    except Exception as e:
+        logger.error(f"Error closing MetaAPI connections: {e}")
+    finally:
+        metaapi_loop.stop()
+
+# Start collecting in this process, or follow the standalone collector (collector.py starts itself)
+if COLLECTOR_MODE == 'embedded':
+    start_collector()
+elif collector_link is not None:
+    collector_link.start()
 
 if __name__ == '__main__':
     # Add error handling for the 404 socket.io errors by disabling socket logging
@@ -887,32 +1459,11 @@ if __name__ == '__main__':
     # Add shutdown cleanup for the MetaAPI connection
     import atexit
     
-    def cleanup():
-        logger.info("Cleaning up MetaAPI connections...")
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Close both MetaAPI connections
-            loop.run_until_complete(meta_api_streaming.close_connection())
-            loop.run_until_complete(position_tracker.close_connection())
-            
-            logger.info("All MetaAPI connections closed")
-        except Exception as e:
-            logger.error(f"Error closing MetaAPI connections: {e}")
-    
-    atexit.register(cleanup)
-    
-    # Initialize position tracker on startup
-    try:
-        logger.info("Initializing position tracker on startup...")
-        init_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(init_loop)
-        init_loop.run_until_complete(position_tracker.initialize())
-        init_loop.close()
-        logger.info("Position tracker initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize position tracker: {e}")
+    if INGESTING:
+        atexit.register(close_metaapi_connections)
+        
+        # Initialize position tracker on startup
+        initialize_position_tracker()
     
     # Get port from environment variable for Heroku compatibility
     port = int(os.environ.get('PORT', 5000))
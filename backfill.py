@@ -0,0 +1,182 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from api.http_client import HttpClient
+from api.fetch_context import FetchContext
+
+logger = logging.getLogger('backfill')
+
+BINANCE_KLINE_URL = os.getenv('BINANCE_KLINE_URL', 'https://api.binance.com/api/v3/klines')
+
+# Binance serves at most this many klines per request
+KLINE_PAGE_LIMIT = 1000
+KLINE_INTERVAL_SECONDS = {'1m': 60}
+
+# Request weight of one klines call at limit=1000 and the per-minute budget we allow ourselves
+KLINE_REQUEST_WEIGHT = 2
+BINANCE_WEIGHT_LIMIT = int(os.getenv('BINANCE_WEIGHT_LIMIT', 1000))
+
+
+class KlineBackfiller:
+    """Fills holes in the BTC tick series from Binance klines.
+
+    ``run`` asks the database for gaps longer than ``min_gap`` seconds in the
+    last ``lookback_hours``, splits each gap into pages of at most 1000
+    candles, fetches the pages in parallel and stores them with
+    ``save_btc_backfill`` (which also merges them into the rollup tables).
+
+    Requests are throttled on the ``X-MBX-USED-WEIGHT-1M`` header Binance
+    returns: once the used weight reaches ``weight_limit`` new requests wait
+    for the next minute. A 429 or 418 response pauses all requests for its
+    ``Retry-After`` and the run stops, leaving the remaining gaps for the next
+    run. 429s are therefore not retried by the HTTP client itself.
+
+    Only closed candles are stored: a candle that is still open would pin a
+    provisional close into the rollups for good, so gaps ending less than one
+    interval ago wait for the next run.
+    """
+
+    def __init__(self, db, symbol='BTCUSDT', url=None, interval='1m', min_gap=90.0,
+                 lookback_hours=24, max_workers=4, weight_limit=BINANCE_WEIGHT_LIMIT, client=None):
+        if interval not in KLINE_INTERVAL_SECONDS:
+            raise ValueError(f"unsupported kline interval: {interval}")
+
+        self.db = db
+        self.symbol = symbol
+        self.url = url or BINANCE_KLINE_URL
+        self.interval = interval
+        self.interval_seconds = KLINE_INTERVAL_SECONDS[interval]
+        self.min_gap = min_gap
+        self.lookback_hours = lookback_hours
+        self.weight_limit = weight_limit
+        # Own client, so urllib3 does not retry 429s before the Retry-After pause can apply
+        self._own_client = client is None
+        self.client = client or HttpClient(retry_statuses=(500, 502, 503, 504))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backfill')
+
+        self.used_weight = 0
+        self.weight_minute = 0
+        self.blocked_until = 0.0
+        self.runs = 0
+        self.gaps_filled = 0
+        self.candles = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.last_run = None
+        self._lock = threading.Lock()
+
+    def _throttle(self):
+        """Wait until a request fits in the current minute's weight budget"""
+        while True:
+            with self._lock:
+                now = time.time()
+                minute = int(now // 60)
+                if minute != self.weight_minute:
+                    self.weight_minute = minute
+                    self.used_weight = 0
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.used_weight + KLINE_REQUEST_WEIGHT > self.weight_limit:
+                    wait = (minute + 1) * 60 - now
+                else:
+                    # Reserve the weight until the response reports the real figure
+                    self.used_weight += KLINE_REQUEST_WEIGHT
+                    return
+            time.sleep(wait)
+
+    def _record_response(self, response):
+        with self._lock:
+            self.requests += 1
+            used = response.headers.get('X-MBX-USED-WEIGHT-1M')
+            if used is not None:
+                self.used_weight = max(self.used_weight, int(used))
+            if response.status_code in (418, 429):
+                self.rate_limited += 1
+                retry_after = float(response.headers.get('Retry-After', 60))
+                self.blocked_until = max(self.blocked_until, time.time() + retry_after)
+
+    def fetch_page(self, start_ms, end_ms):
+        """One klines request; returns candles as (open_time, o, h, l, c, volume, close_time) in seconds"""
+        self._throttle()
+        response = self.client.get(self.url, params={
+            'symbol': self.symbol,
+            'interval': self.interval,
+            'startTime': start_ms,
+            'endTime': end_ms,
+            'limit': KLINE_PAGE_LIMIT
+        })
+        self._record_response(response)
+        response.raise_for_status()
+
+        # Binance kline format: [Open time, Open, High, Low, Close, Volume, Close time, ...]
+        now_ms = time.time() * 1000
+        return [
+            (candle[0] / 1000, float(candle[1]), float(candle[2]), float(candle[3]),
+             float(candle[4]), float(candle[5]), (candle[6] + 1) / 1000)
+            for candle in response.json()
+            if candle[6] < now_ms
+        ]
+
+    def fetch_range(self, start, end):
+        """Candles opening strictly between two ticks, fetched one page per 1000 intervals in parallel"""
+        start_ms = int(start * 1000) + 1
+        end_ms = int(end * 1000) - 1
+        page_ms = KLINE_PAGE_LIMIT * self.interval_seconds * 1000
+
+        ctx = FetchContext(self.executor)
+        pages = [(page_start, min(page_start + page_ms - 1, end_ms))
+                 for page_start in range(start_ms, end_ms + 1, page_ms)]
+        for page in pages:
+            ctx.submit(self.fetch_page, *page)
+
+        candles = []
+        for page in pages:
+            candles.extend(ctx.get(self.fetch_page, *page))
+        return candles
+
+    def run(self):
+        """Find and fill gaps once; returns the number of candles stored"""
+        start_time = time.time() - self.lookback_hours * 3600
+        gaps = self.db.find_btc_gaps(start_time, min_gap=self.min_gap)
+        stored = 0
+
+        for gap_start, gap_end in gaps:
+            if gap_end > time.time() - self.interval_seconds:
+                # Its last candle may still be open; the gap is recorded as filled once saved
+                continue
+            try:
+                candles = self.fetch_range(gap_start, gap_end)
+            except Exception as e:
+                # Leave this and later gaps for the next run (rate limited or upstream down)
+                logger.error(f"Error fetching klines for gap {gap_start:.0f}-{gap_end:.0f}: {e}")
+                break
+
+            stored += self.db.save_btc_backfill(gap_start, gap_end, candles)
+            with self._lock:
+                self.gaps_filled += 1
+                self.candles += len(candles)
+            logger.info(f"Backfilled {len(candles)} candles for a {gap_end - gap_start:.0f}s gap")
+
+        with self._lock:
+            self.runs += 1
+            self.last_run = time.time()
+        return stored
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'gaps_filled': self.gaps_filled,
+                'candles': self.candles,
+                'requests': self.requests,
+                'rate_limited': self.rate_limited,
+                'used_weight': self.used_weight,
+                'last_run': self.last_run
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self._own_client:
+            self.client.close()
@@ -0,0 +1,67 @@
+"""Standalone ingestion process for the dashboard.
+
+Owns everything that talks to upstreams or writes the database: the Binance
+feed and price sampling, MT5 sampling over MetaAPI, retention, gap backfill and
+the write-behind DB writer. Web workers started with COLLECTOR_MODE=external
+read its live buffer and position from shared memory and follow its events
+over the COLLECTOR_SOCKET Unix socket, so any number of them share one set of
+upstream connections and one writer:
+
+    python collector.py
+    COLLECTOR_MODE=external gunicorn app:app --workers 4
+
+gunicorn.conf.py starts it automatically next to the web workers.
+"""
+import os
+import signal
+import logging
+import threading
+
+# Must be set before the dashboard module is imported, so it does not start collecting on its own
+os.environ['COLLECTOR_MODE'] = 'collector'
+
+import app as dashboard
+from live_link import LiveLinkServer
+
+logger = logging.getLogger('collector')
+
+# How often ingestion stats (DB writer, HTTP, MetaAPI, jobs) are pushed to the web workers
+LINK_STATS_INTERVAL = 5
+
+
+def main():
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+
+    # Check before creating the shared memory, which would replace a running collector's
+    if LiveLinkServer.in_use(dashboard.COLLECTOR_SOCKET):
+        raise SystemExit(f"A collector is already serving {dashboard.COLLECTOR_SOCKET}")
+    dashboard.create_shared_state()
+
+    link = LiveLinkServer(dashboard.COLLECTOR_SOCKET, snapshot=dashboard.live_state_snapshot)
+    link.start()
+    dashboard.live_link = link
+    dashboard.collector.add_job('link_stats', dashboard.publish_link_stats, LINK_STATS_INTERVAL)
+
+    dashboard.start_collector()
+
+    # The first MetaAPI synchronization can take minutes; sampling runs meanwhile
+    threading.Thread(target=dashboard.initialize_position_tracker, name='position-init', daemon=True).start()
+    logger.info("Collector running")
+
+    stopping.wait()
+
+    # Stop dispatching first; jobs still waiting on MetaAPI end once its loop is stopped
+    logger.info("Stopping collector...")
+    dashboard.stop_collector(wait=False)
+    dashboard.live_link = None
+    link.stop()
+    dashboard.close_metaapi_connections()
+    dashboard.db.disconnect()
+    dashboard.live_data.unlink()
+    dashboard.shared_state.unlink()
+
+
+if __name__ == '__main__':
+    main()
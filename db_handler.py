@@ -1,235 +1,1355 @@
 import sqlite3
 import time
+import atexit
+import heapq
+import queue
+import logging
+import threading
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+# Pragmas applied to every connection. WAL lets readers run against a snapshot
+# while the writer appends, and NORMAL synchronous is durable across application
+# crashes in WAL mode while skipping the fsync on every commit.
+CONNECTION_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,      # negative value = KiB, i.e. ~16 MB page cache
+    'mmap_size': 268435456,    # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000       # milliseconds
+}
+
+# Candle intervals (in seconds) maintained incrementally as ticks are written
+OHLC_ROLLUP_INTERVALS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60
+}
+
+# Value columns of the compact tick tables (after the ts_ms primary key)
+COMPACT_TABLE_COLUMNS = {
+    'btc_prices': 'price REAL NOT NULL',
+    'mt5_equity': 'equity REAL NOT NULL, position TEXT'
+}
+
+# Value column of each tick series, as aggregated by aggregate_ticks
+TICK_VALUE_COLUMNS = {
+    'btc_prices': 'price',
+    'mt5_equity': 'equity'
+}
+
+# Width of the klines stored in btc_backfill (keyed by their close time)
+BACKFILL_CANDLE_SECONDS = 60
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Symbol whose ticks go to the dedicated btc_prices tables (rollups, partitions);
+# every other symbol is stored in the symbol-keyed symbol_prices table
+PRIMARY_SYMBOL = 'BTCUSDT'
+
+logger = logging.getLogger('db_handler')
+
+# Queue markers understood by the BatchWriter thread
+_STOP = object()
+
+
+class BatchWriter:
+    """Background writer that group-commits queued inserts.
+
+    Producers call ``submit`` with an INSERT statement and its parameters and
+    return immediately. The writer thread collects items until either
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have passed
+    since the first pending row, then writes them in a single transaction with
+    one ``executemany`` per statement.
+    """
+
+    def __init__(self, handler, max_queue_size=10000, batch_size=500, flush_interval=1.0,
+                 put_timeout=1.0):
+        self.handler = handler
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self.rows_failed = 0
+        self.last_batch_size = 0
+        self.last_flush_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='db-batch-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, statement, params):
+        """Queue a single row for insertion"""
+        return self.submit_rows([(statement, params)])
+
+    def submit_rows(self, rows):
+        """Queue several (statement, params) rows that must land in the same transaction.
+
+        Blocks for at most ``put_timeout`` seconds when the queue is full and
+        drops the rows after that so the caller is never stalled indefinitely.
+
+        Returns:
+            bool: True if the rows were queued
+        """
+        rows = list(rows)
+        try:
+            self.queue.put(rows, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.rows_dropped += len(rows)
+            logger.warning("Database write queue full, dropping row")
+            return False
+
+    def flush(self, timeout=None):
+        """Block until everything queued before this call has been committed"""
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout=10):
+        """Flush outstanding rows and stop the writer thread"""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def queue_depth(self):
+        """Number of items waiting to be written"""
+        return self.queue.qsize()
+
+    def get_stats(self):
+        """Return counters describing the writer's throughput and backlog"""
+        with self._stats_lock:
+            return {
+                'queue_depth': self.queue_depth(),
+                'queue_capacity': self.queue.maxsize,
+                'rows_written': self.rows_written,
+                'batches_written': self.batches_written,
+                'rows_dropped': self.rows_dropped,
+                'rows_failed': self.rows_failed,
+                'last_batch_size': self.last_batch_size,
+                'last_flush_seconds': self.last_flush_seconds,
+                'running': self._thread.is_alive()
+            }
+
+    def _write_batch(self, pending):
+        """Write pending rows in one transaction, one executemany per statement"""
+        if not pending:
+            return
+
+        grouped = {}
+        for statement, params in pending:
+            grouped.setdefault(statement, []).append(params)
+
+        started = time.perf_counter()
+        try:
+            with self.handler._writer() as conn:
+                for statement, rows in grouped.items():
+                    conn.executemany(statement, rows)
+        except Exception as e:
+            logger.error(f"Error writing batch of {len(pending)} rows: {e}")
+            with self._stats_lock:
+                self.rows_failed += len(pending)
+            return
+
+        with self._stats_lock:
+            self.rows_written += len(pending)
+            self.batches_written += 1
+            self.last_batch_size = len(pending)
+            self.last_flush_seconds = time.perf_counter() - started
+
+    def _run(self):
+        pending = []
+        deadline = None
+
+        while True:
+            if pending:
+                wait = max(0.0, deadline - time.monotonic())
+            else:
+                wait = None
+
+            try:
+                item = self.queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+
+            waiters = []
+            stopping = False
+
+            # Drain whatever else is already queued without waiting
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    if not pending:
+                        deadline = time.monotonic() + self.flush_interval
+                    pending.extend(item)
+                if len(pending) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if pending and (stopping or waiters or len(pending) >= self.batch_size
+                            or time.monotonic() >= deadline):
+                self._write_batch(pending)
+                pending = []
+                deadline = None
+
+            for waiter in waiters:
+                waiter.set()
+
+            if stopping:
+                return
+
 
 class DatabaseHandler:
-    def __init__(self, db_path='crypto_dashboard.db'):
+    def __init__(self, db_path='crypto_dashboard.db', read_pool_size=4, write_behind=False,
+                 batch_size=500, flush_interval=1.0, max_queue_size=10000, compact_schema=False,
+                 partitioned=False, readonly=False):
         self.db_path = db_path
+        self.readonly = readonly
+        self.read_pool_size = max(1, int(read_pool_size))
         self.conn = None
-        self.cursor = None
+        self._read_pool = None
+        self._read_connections = []
+        self._write_lock = threading.RLock()
+        self._filled_rollups = set()
+        self._partitions = set()
+        self._schema_version = None
+        self._default_compact_schema = bool(compact_schema)
+        self.batch_writer = None
+        self.connect()
+
+        if readonly:
+            # Only the ingesting process creates, migrates and fills tables; this one
+            # follows whatever layout it finds (see _follow_layout)
+            with self._writer() as conn:
+                self._follow_layout(conn)
+            atexit.register(self.disconnect)
+            return
+
+        # An existing database keeps the layout it was created with unless the compact
+        # schema or partitioning is requested, in which case tables are migrated in place
+        self.partitioned = self._table_exists('tick_partitions')
+        self.compact_schema = True if self.partitioned else self._detect_compact_schema()
+        if self.compact_schema is None:
+            self.compact_schema = bool(compact_schema)
+        elif compact_schema and not self.compact_schema:
+            self.migrate_to_compact_schema()
+        if partitioned and not self.partitioned:
+            self.migrate_to_partitions()
         self.initialize_db()
-        
+
+        # Aggregate ticks that predate the rollup tables now, so readers never have to
+        for name in OHLC_ROLLUP_INTERVALS:
+            self._ensure_rollup_filled(name)
+
+        # Optional write-behind queue; when disabled every save is committed immediately
+        if write_behind:
+            self.batch_writer = BatchWriter(
+                self,
+                max_queue_size=max_queue_size,
+                batch_size=batch_size,
+                flush_interval=flush_interval
+            )
+
+        # Make sure the WAL is checkpointed and connections are closed on exit
+        atexit.register(self.disconnect)
+
+    def _open_connection(self, readonly=False):
+        """Open a SQLite connection with the tuned pragmas applied"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=CONNECTION_PRAGMAS['busy_timeout'] / 1000,
+            isolation_level=None if readonly else 'DEFERRED'
+        )
+        if not readonly:
+            conn.execute('PRAGMA journal_mode=WAL')
+        for name, value in CONNECTION_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        if readonly:
+            conn.execute('PRAGMA query_only=1')
+        return conn
+
     def connect(self):
-        """Establish database connection"""
-        self.conn = sqlite3.connect(self.db_path)
-        self.cursor = self.conn.cursor()
-        
+        """Open the long-lived writer connection and the pool of reader connections"""
+        with self._write_lock:
+            if self.conn is not None:
+                return
+
+            # The writer is opened first so WAL mode is in place before any reader attaches
+            self.conn = self._open_connection(readonly=self.readonly)
+            self._read_pool = queue.Queue()
+            self._read_connections = []
+            for _ in range(self.read_pool_size):
+                reader = self._open_connection(readonly=True)
+                self._read_connections.append(reader)
+                self._read_pool.put(reader)
+
     def disconnect(self):
-        """Close database connection"""
-        if self.conn:
+        """Flush queued writes, checkpoint the WAL and close all database connections"""
+        batch_writer = getattr(self, 'batch_writer', None)
+        if batch_writer is not None:
+            batch_writer.stop()
+            self.batch_writer = None
+
+        with self._write_lock:
+            if self.conn is None:
+                return
+
+            for reader in self._read_connections:
+                try:
+                    reader.close()
+                except sqlite3.Error:
+                    pass
+            self._read_connections = []
+            self._read_pool = None
+
+            if not self.readonly:
+                try:
+                    self.conn.commit()
+                    self.conn.execute('PRAGMA optimize')
+                    self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                except sqlite3.Error:
+                    pass
             self.conn.close()
             self.conn = None
-            self.cursor = None
-    
-    def initialize_db(self):
-        """Initialize database tables if they don't exist"""
-        self.connect()
-        
-        # Create BTC price table
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS btc_prices (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp REAL NOT NULL,
-            datetime TEXT NOT NULL,
-            price REAL NOT NULL
-        )
+
+    @contextmanager
+    def _writer(self):
+        """Serialize access to the writer connection and commit on success"""
+        with self._write_lock:
+            if self.conn is None:
+                self.connect()
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    @contextmanager
+    def _reader(self):
+        """Borrow a reader connection from the pool.
+
+        Readers see the last committed snapshot and never wait on the writer.
+        """
+        if self._read_pool is None:
+            self.connect()
+        pool = self._read_pool
+        conn = pool.get()
+        try:
+            if self.readonly:
+                self._follow_layout(conn)
+            yield conn
+        finally:
+            pool.put(conn)
+
+    def _follow_layout(self, conn):
+        """Pick up the layout left by the ingesting process whenever its schema changes"""
+        version = conn.execute('PRAGMA schema_version').fetchone()[0]
+        if version == self._schema_version:
+            return
+
+        partitioned = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tick_partitions'"
+        ).fetchone() is not None
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(btc_prices)')]
+        if partitioned:
+            compact_schema = True
+        elif columns:
+            compact_schema = 'ts_ms' in columns
+        else:
+            # Not created yet; the ingesting process uses the same setting
+            compact_schema = self._default_compact_schema
+        self.partitioned, self.compact_schema = partitioned, compact_schema
+        self._schema_version = version
+
+    def _table_exists(self, name):
+        """Check whether a table exists in the database"""
+        with self._writer() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+            ).fetchone()
+        return row is not None
+
+    def _detect_compact_schema(self):
+        """Return True/False for an existing btc_prices layout, None for a new database"""
+        with self._writer() as conn:
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(btc_prices)')]
+        if not columns:
+            return None
+        return 'ts_ms' in columns
+
+    @property
+    def _time_column(self):
+        """Column holding the tick time in the active schema"""
+        return 'ts_ms' if self.compact_schema else 'timestamp'
+
+    @property
+    def _time_scale(self):
+        """Units of the time column per second"""
+        return 1000 if self.compact_schema else 1
+
+    @property
+    def _time_select(self):
+        """SQL expression returning the tick time in unix seconds"""
+        return 'ts_ms / 1000.0' if self.compact_schema else 'timestamp'
+
+    def _time_key(self, timestamp):
+        """Convert unix seconds to the value stored in the time column"""
+        if self.compact_schema:
+            return int(round(timestamp * 1000))
+        return timestamp
+
+    @staticmethod
+    def _create_compact_table(conn, series, name):
+        """Create a compact tick table for a series, clustered on integer millisecond keys"""
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            ts_ms INTEGER PRIMARY KEY,
+            {COMPACT_TABLE_COLUMNS[series]}
+        ) WITHOUT ROWID
         ''')
-        
-        # Create MT5 equity table
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS mt5_equity (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp REAL NOT NULL,
-            datetime TEXT NOT NULL,
-            equity REAL NOT NULL,
-            position TEXT
-        )
+
+    @staticmethod
+    def _create_symbol_table(conn, name):
+        """Create a table for ticks of the non-BTC symbols, clustered by (symbol, time)"""
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name} (
+            symbol TEXT NOT NULL,
+            ts_ms INTEGER NOT NULL,
+            price REAL NOT NULL,
+            PRIMARY KEY (symbol, ts_ms)
+        ) WITHOUT ROWID
         ''')
-        
-        # Create index on timestamp for faster queries
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_btc_timestamp ON btc_prices(timestamp)')
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_mt5_timestamp ON mt5_equity(timestamp)')
-        
-        self.conn.commit()
-        self.disconnect()
-    
-    def save_btc_price(self, price):
-        """Save BTC price to database"""
-        self.connect()
-        current_time = time.time()
-        datetime_str = datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')
-        
-        self.cursor.execute(
-            'INSERT INTO btc_prices (timestamp, datetime, price) VALUES (?, ?, ?)',
-            (current_time, datetime_str, price)
+
+    @classmethod
+    def _create_compact_tables(cls, conn, suffix=''):
+        """Create the compact tick tables"""
+        for series in COMPACT_TABLE_COLUMNS:
+            cls._create_compact_table(conn, series, series + suffix)
+
+    def migrate_to_compact_schema(self, vacuum=True):
+        """Convert legacy tick tables to the compact schema in place
+
+        Rows are copied into WITHOUT ROWID tables keyed by integer milliseconds,
+        the text datetime column and the secondary timestamp indexes are dropped,
+        and the file is vacuumed to return the freed pages.
+
+        Returns:
+            bool: True if a migration was performed
+        """
+        self.flush()
+        with self._write_lock:
+            if self._detect_compact_schema() is not False:
+                self.compact_schema = True
+                return False
+
+            with self._writer() as conn:
+                self._create_compact_tables(conn, suffix='_compact')
+                conn.execute('''
+                INSERT OR REPLACE INTO btc_prices_compact (ts_ms, price)
+                SELECT CAST(ROUND(timestamp * 1000) AS INTEGER), price FROM btc_prices ORDER BY timestamp
+                ''')
+                conn.execute('''
+                INSERT OR REPLACE INTO mt5_equity_compact (ts_ms, equity, position)
+                SELECT CAST(ROUND(timestamp * 1000) AS INTEGER), equity, position FROM mt5_equity ORDER BY timestamp
+                ''')
+                conn.execute('DROP TABLE btc_prices')
+                conn.execute('DROP TABLE mt5_equity')
+                conn.execute('ALTER TABLE btc_prices_compact RENAME TO btc_prices')
+                conn.execute('ALTER TABLE mt5_equity_compact RENAME TO mt5_equity')
+
+            self.compact_schema = True
+            if vacuum:
+                self.conn.execute('VACUUM')
+        return True
+
+    @staticmethod
+    def _partition_day(timestamp):
+        """UTC day (YYYYMMDD) a timestamp belongs to"""
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%d')
+
+    def _create_partition(self, conn, series, day):
+        """Create the table for one series and UTC day and register it in the catalog.
+
+        An insert trigger keeps the catalog row count exact, so retention can report
+        how many rows a partition held without scanning it.
+        """
+        name = f'{series}_{day}'
+        start_ts = datetime.strptime(day, '%Y%m%d').replace(tzinfo=timezone.utc).timestamp()
+
+        if series == 'symbol_prices':
+            self._create_symbol_table(conn, name)
+        else:
+            self._create_compact_table(conn, series, name)
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {name}_count AFTER INSERT ON {name}
+        BEGIN
+            UPDATE tick_partitions SET row_count = row_count + 1
+            WHERE series = '{series}' AND day = '{day}';
+        END
+        ''')
+        conn.execute(
+            '''INSERT OR IGNORE INTO tick_partitions (series, day, start_ts, end_ts, row_count)
+            VALUES (?, ?, ?, ?, 0)''',
+            (series, day, start_ts, start_ts + SECONDS_PER_DAY)
         )
-        
-        self.conn.commit()
-        self.disconnect()
-        
-    def save_mt5_equity(self, equity, position="No Position"):
+        return name
+
+    def _partition_for(self, series, timestamp):
+        """Name of the partition a new row belongs to, creating it on first use"""
+        day = self._partition_day(timestamp)
+        name = f'{series}_{day}'
+        if name not in self._partitions:
+            with self._writer() as conn:
+                self._create_partition(conn, series, day)
+            self._partitions.add(name)
+        return name
+
+    def _tick_tables(self, conn, series, start_timestamp=None, end_timestamp=None):
+        """Tables holding a series' ticks for a time window, oldest first"""
+        if not self.partitioned:
+            return [series]
+
+        rows = conn.execute(
+            '''SELECT day FROM tick_partitions
+            WHERE series = ? AND end_ts > ? AND start_ts <= ? ORDER BY start_ts''',
+            (
+                series,
+                start_timestamp if start_timestamp is not None else float('-inf'),
+                end_timestamp if end_timestamp is not None else float('inf')
+            )
+        ).fetchall()
+        return [f'{series}_{day}' for (day,) in rows]
+
+    def _query_ticks(self, series, columns, start_timestamp=None, end_timestamp=None,
+                     include_start=True):
+        """Read ticks of a series ordered by time, across partitions if needed
+
+        Returns:
+            List of tuples (timestamp, *columns) with timestamp in unix seconds
+        """
+        conditions = []
+        params = []
+        if start_timestamp is not None:
+            conditions.append(f"{self._time_column} {'>=' if include_start else '>'} ?")
+            params.append(self._time_key(start_timestamp))
+        if end_timestamp is not None:
+            conditions.append(f'{self._time_column} <= ?')
+            params.append(self._time_key(end_timestamp))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        results = []
+        with self._reader() as conn:
+            # One read transaction so the partition list and the reads share a snapshot
+            conn.execute('BEGIN')
+            try:
+                for table in self._tick_tables(conn, series, start_timestamp, end_timestamp):
+                    results.extend(conn.execute(
+                        f'''SELECT {self._time_select}, {columns} FROM {table}
+                        {where} ORDER BY {self._time_column}''',
+                        params
+                    ).fetchall())
+            finally:
+                conn.execute('COMMIT')
+        return results
+
+    def migrate_to_partitions(self):
+        """Move ticks from the single tick tables into daily partitions
+
+        Partitions always use the compact layout, so rows from legacy tables are
+        converted to integer millisecond keys on the way.
+
+        Returns:
+            bool: True if a migration was performed
+        """
+        self.flush()
+        with self._write_lock:
+            if self.partitioned:
+                return False
+
+            with self._writer() as conn:
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS tick_partitions (
+                    series TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    start_ts REAL NOT NULL,
+                    end_ts REAL NOT NULL,
+                    row_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (series, day)
+                )
+                ''')
+
+                for series, value_ddl in COMPACT_TABLE_COLUMNS.items():
+                    if not conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (series,)
+                    ).fetchone():
+                        continue
+
+                    key = 'ts_ms' if self.compact_schema else 'CAST(ROUND(timestamp * 1000) AS INTEGER)'
+                    value_columns = ', '.join(column.split()[0] for column in value_ddl.split(','))
+                    days = conn.execute(
+                        f'SELECT DISTINCT {key} / {SECONDS_PER_DAY * 1000} FROM {series}'
+                    ).fetchall()
+
+                    for (day_index,) in days:
+                        day_start = day_index * SECONDS_PER_DAY
+                        partition = self._create_partition(conn, series, self._partition_day(day_start))
+                        conn.execute(
+                            f'''INSERT OR IGNORE INTO {partition} (ts_ms, {value_columns})
+                            SELECT {key}, {value_columns} FROM {series}
+                            WHERE {key} >= ? AND {key} < ? ORDER BY 1''',
+                            (day_start * 1000, (day_start + SECONDS_PER_DAY) * 1000)
+                        )
+                        self._partitions.add(partition)
+
+                    conn.execute(f'DROP TABLE {series}')
+
+                # The other symbols' ticks are split by day the same way
+                if conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'symbol_prices'"
+                ).fetchone():
+                    days = conn.execute(
+                        f'SELECT DISTINCT ts_ms / {SECONDS_PER_DAY * 1000} FROM symbol_prices'
+                    ).fetchall()
+                    for (day_index,) in days:
+                        day_start = day_index * SECONDS_PER_DAY
+                        partition = self._create_partition(conn, 'symbol_prices', self._partition_day(day_start))
+                        conn.execute(
+                            f'''INSERT OR IGNORE INTO {partition} (symbol, ts_ms, price)
+                            SELECT symbol, ts_ms, price FROM symbol_prices
+                            WHERE ts_ms >= ? AND ts_ms < ? ORDER BY symbol, ts_ms''',
+                            (day_start * 1000, (day_start + SECONDS_PER_DAY) * 1000)
+                        )
+                        self._partitions.add(partition)
+                    conn.execute('DROP TABLE symbol_prices')
+
+            self.partitioned = True
+            self.compact_schema = True
+        return True
+
+    def _latest_tick_timestamp(self, conn, series):
+        """Newest tick time of a series in unix seconds, 0 if there are no ticks"""
+        tables = self._tick_tables(conn, series)
+        if not tables:
+            return 0
+        row = conn.execute(f'SELECT MAX({self._time_column}) FROM {tables[-1]}').fetchone()
+        return (row[0] or 0) / self._time_scale
+
+    def initialize_db(self):
+        """Initialize database tables if they don't exist"""
+        with self._writer() as conn:
+            if self.partitioned:
+                # Tick tables are created per UTC day on first write
+                pass
+            elif self.compact_schema:
+                self._create_compact_tables(conn)
+            else:
+                # Create BTC price table
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS btc_prices (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL NOT NULL,
+                    datetime TEXT NOT NULL,
+                    price REAL NOT NULL
+                )
+                ''')
+
+                # Create MT5 equity table
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS mt5_equity (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL NOT NULL,
+                    datetime TEXT NOT NULL,
+                    equity REAL NOT NULL,
+                    position TEXT
+                )
+                ''')
+
+                # Create index on timestamp for faster queries
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_btc_timestamp ON btc_prices(timestamp)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_mt5_timestamp ON mt5_equity(timestamp)')
+
+            # Ticks for every other watched symbol, clustered by (symbol, time) so a
+            # symbol's range query is a single index range scan (daily tables when partitioned)
+            if not self.partitioned:
+                self._create_symbol_table(conn, 'symbol_prices')
+
+            # One-minute klines fetched from Binance for gaps in the tick series, keyed by
+            # candle close time, and the gap ranges that have already been requested
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS btc_backfill (
+                ts_ms INTEGER PRIMARY KEY,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL
+            ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS btc_backfill_ranges (
+                start_ts REAL NOT NULL,
+                end_ts REAL NOT NULL,
+                candles INTEGER NOT NULL,
+                filled_at REAL NOT NULL,
+                PRIMARY KEY (start_ts, end_ts)
+            ) WITHOUT ROWID
+            ''')
+
+            # Track which rollups still need to be filled from ticks written before they existed
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS ohlc_rollup_state (
+                table_name TEXT PRIMARY KEY,
+                backfill_before REAL NOT NULL,
+                filled INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+
+            # Create one pre-aggregated candle table per rollup interval, keyed by bucket start
+            for name in OHLC_ROLLUP_INTERVALS:
+                table = self._rollup_table(name)
+                conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket INTEGER PRIMARY KEY,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    tick_count INTEGER NOT NULL,
+                    first_ts REAL NOT NULL,
+                    last_ts REAL NOT NULL
+                )
+                ''')
+
+                # Every tick from now on is rolled up as it is written, so only rows
+                # up to the current newest tick have to be aggregated on first use
+                conn.execute(
+                    '''INSERT OR IGNORE INTO ohlc_rollup_state (table_name, backfill_before, filled)
+                    VALUES (?, ?, 0)''',
+                    (table, self._latest_tick_timestamp(conn, 'btc_prices'))
+                )
+
+    @staticmethod
+    def _rollup_table(name):
+        """Name of the candle table for a rollup interval such as '15m'"""
+        return f'btc_ohlc_{name}'
+
+    @staticmethod
+    def _rollup_upsert_sql(table, select=None):
+        """Build the statement that merges one or more candles into a rollup table.
+
+        Open and close follow the earliest and latest tick timestamps, so merging
+        is order independent and late or backfilled ticks land correctly.
+        """
+        source = select or 'VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+        return f'''
+        INSERT INTO {table} (bucket, open, high, low, close, tick_count, first_ts, last_ts)
+        {source}
+        ON CONFLICT(bucket) DO UPDATE SET
+            open = CASE WHEN excluded.first_ts < first_ts THEN excluded.open ELSE open END,
+            high = MAX(high, excluded.high),
+            low = MIN(low, excluded.low),
+            close = CASE WHEN excluded.last_ts >= last_ts THEN excluded.close ELSE close END,
+            tick_count = tick_count + excluded.tick_count,
+            first_ts = MIN(first_ts, excluded.first_ts),
+            last_ts = MAX(last_ts, excluded.last_ts)
+        '''
+
+    def _rollup_rows(self, timestamp, price):
+        """Rollup upserts for a single BTC tick, one per candle interval"""
+        rows = []
+        for name, seconds in OHLC_ROLLUP_INTERVALS.items():
+            bucket = int(timestamp // seconds) * seconds
+            rows.append((
+                self._rollup_upsert_sql(self._rollup_table(name)),
+                (bucket, price, price, price, price, 1, timestamp, timestamp)
+            ))
+        return rows
+
+    def _ensure_rollup_filled(self, name):
+        """Aggregate ticks that predate the rollup table, once per database"""
+        table = self._rollup_table(name)
+        if table in self._filled_rollups or self.readonly:
+            return
+
+        with self._writer() as conn:
+            row = conn.execute(
+                'SELECT backfill_before, filled FROM ohlc_rollup_state WHERE table_name = ?',
+                (table,)
+            ).fetchone()
+
+            if row and not row[1]:
+                seconds = OHLC_ROLLUP_INTERVALS[name]
+                column = self._time_column
+
+                # Candles merge order-independently, so partitions can be folded in one by one
+                for source in self._tick_tables(conn, 'btc_prices', end_timestamp=row[0]):
+                    select = f'''
+                    SELECT g.bucket,
+                        (SELECT price FROM {source} WHERE {column} = g.first_key LIMIT 1),
+                        g.high, g.low,
+                        (SELECT price FROM {source} WHERE {column} = g.last_key LIMIT 1),
+                        g.tick_count, g.first_key / :scale, g.last_key / :scale
+                    FROM (
+                        SELECT CAST({column} / (:seconds * :scale) AS INTEGER) * :seconds AS bucket,
+                            MAX(price) AS high, MIN(price) AS low, COUNT(*) AS tick_count,
+                            MIN({column}) AS first_key, MAX({column}) AS last_key
+                        FROM {source}
+                        WHERE {column} <= :before
+                        GROUP BY bucket
+                    ) AS g
+                    WHERE true
+                    '''
+                    conn.execute(
+                        self._rollup_upsert_sql(table, select),
+                        {'seconds': seconds, 'scale': float(self._time_scale), 'before': self._time_key(row[0])}
+                    )
+                conn.execute('UPDATE ohlc_rollup_state SET filled = 1 WHERE table_name = ?', (table,))
+
+        self._filled_rollups.add(table)
+
+    def _insert(self, statement, params, extra_rows=()):
+        """Run an INSERT directly or hand it to the write-behind queue.
+
+        ``extra_rows`` are further (statement, params) pairs that are written in
+        the same transaction, e.g. the rollup upserts for a tick.
+        """
+        rows = [(statement, params)]
+        rows.extend(extra_rows)
+
+        if self.batch_writer is not None:
+            return self.batch_writer.submit_rows(rows)
+
+        with self._writer() as conn:
+            for row_statement, row_params in rows:
+                conn.execute(row_statement, row_params)
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until all queued writes have been committed"""
+        if self.batch_writer is None:
+            return True
+        return self.batch_writer.flush(timeout)
+
+    def get_writer_stats(self):
+        """Return write-behind queue depth and throughput counters"""
+        if self.batch_writer is None:
+            return {'queue_depth': 0, 'write_behind': False}
+
+        stats = self.batch_writer.get_stats()
+        stats['write_behind'] = True
+        return stats
+
+    def save_btc_price(self, price, timestamp=None):
+        """Save BTC price to database"""
+        current_time = timestamp if timestamp is not None else time.time()
+        rows = self._btc_price_rows(price, current_time)
+        return self._insert(*rows[0], extra_rows=rows[1:])
+
+    def save_prices(self, prices, timestamp=None):
+        """Save one tick for several symbols in a single write
+
+        Args:
+            prices: dict mapping symbol (e.g. 'BTCUSDT') to price
+            timestamp: unix time of the tick (defaults to now)
+        """
+        current_time = timestamp if timestamp is not None else time.time()
+        if self.partitioned:
+            # As for the BTC/MT5 partitions: a replaced duplicate would fire the row_count trigger again
+            symbol_table = self._partition_for('symbol_prices', current_time)
+            symbol_insert = f'INSERT OR IGNORE INTO {symbol_table}'
+        else:
+            symbol_insert = 'INSERT OR REPLACE INTO symbol_prices'
+        rows = []
+        for symbol, price in prices.items():
+            if symbol == PRIMARY_SYMBOL:
+                rows.extend(self._btc_price_rows(price, current_time))
+            else:
+                rows.append((
+                    f'{symbol_insert} (symbol, ts_ms, price) VALUES (?, ?, ?)',
+                    (symbol, int(round(current_time * 1000)), price)
+                ))
+        if not rows:
+            return True
+        return self._insert(*rows[0], extra_rows=rows[1:])
+
+    def _btc_price_rows(self, price, current_time):
+        """(statement, params) pairs that store one BTC tick and its rollups"""
+        if self.partitioned:
+            table = self._partition_for('btc_prices', current_time)
+            statement = f'INSERT OR IGNORE INTO {table} (ts_ms, price) VALUES (?, ?)'
+            params = (self._time_key(current_time), price)
+        elif self.compact_schema:
+            statement = 'INSERT OR REPLACE INTO btc_prices (ts_ms, price) VALUES (?, ?)'
+            params = (self._time_key(current_time), price)
+        else:
+            datetime_str = datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')
+            statement = 'INSERT INTO btc_prices (timestamp, datetime, price) VALUES (?, ?, ?)'
+            params = (current_time, datetime_str, price)
+
+        return [(statement, params)] + self._rollup_rows(current_time, price)
+
+    def save_mt5_equity(self, equity, position="No Position", timestamp=None):
         """Save MT5 equity to database"""
-        self.connect()
-        current_time = time.time()
-        datetime_str = datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')
-        
-        self.cursor.execute(
-            'INSERT INTO mt5_equity (timestamp, datetime, equity, position) VALUES (?, ?, ?, ?)',
-            (current_time, datetime_str, equity, position)
-        )
-        
-        self.conn.commit()
-        self.disconnect()
-    
+        current_time = timestamp if timestamp is not None else time.time()
+
+        if self.partitioned:
+            table = self._partition_for('mt5_equity', current_time)
+            statement = f'INSERT OR IGNORE INTO {table} (ts_ms, equity, position) VALUES (?, ?, ?)'
+            params = (self._time_key(current_time), equity, position)
+        elif self.compact_schema:
+            statement = 'INSERT OR REPLACE INTO mt5_equity (ts_ms, equity, position) VALUES (?, ?, ?)'
+            params = (self._time_key(current_time), equity, position)
+        else:
+            datetime_str = datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')
+            statement = 'INSERT INTO mt5_equity (timestamp, datetime, equity, position) VALUES (?, ?, ?, ?)'
+            params = (current_time, datetime_str, equity, position)
+
+        return self._insert(statement, params)
+
     def get_btc_data(self, timeframe_hours=5):
         """Get BTC price data for the specified timeframe"""
-        self.connect()
-        
         # Calculate the timestamp for the start of the timeframe
         start_time = time.time() - (timeframe_hours * 60 * 60)
-        
+
         # Query data after start_time
-        self.cursor.execute(
-            'SELECT timestamp, price FROM btc_prices WHERE timestamp > ? ORDER BY timestamp',
-            (start_time,)
-        )
-        
-        results = self.cursor.fetchall()
-        self.disconnect()
-        
+        results = self._query_ticks('btc_prices', 'price', start_time, include_start=False)
+
         if not results:
             return [], []
-            
+
         # Unpack results
         timestamps, prices = zip(*results)
         return list(timestamps), list(prices)
-    
+
     def get_mt5_data(self, timeframe_hours=5):
         """Get MT5 equity data for the specified timeframe"""
-        self.connect()
-        
         # Calculate the timestamp for the start of the timeframe
         start_time = time.time() - (timeframe_hours * 60 * 60)
-        
+
         # Query data after start_time
-        self.cursor.execute(
-            'SELECT timestamp, equity, position FROM mt5_equity WHERE timestamp > ? ORDER BY timestamp',
-            (start_time,)
-        )
-        
-        results = self.cursor.fetchall()
-        self.disconnect()
-        
+        results = self._query_ticks('mt5_equity', 'equity, position', start_time, include_start=False)
+
         if not results:
             return [], [], []
-            
+
         # Unpack results
         timestamps, equity_values, positions = zip(*results)
         return list(timestamps), list(equity_values), list(positions)
-    
+
     def get_btc_ohlc(self, timeframe_hours=5, interval_minutes=15):
         """Get BTC OHLC (Open-High-Low-Close) data for TradingView-like charts"""
-        self.connect()
-        
-        # Calculate the timestamp for the start of the timeframe
-        start_time = time.time() - (timeframe_hours * 60 * 60)
-        
-        # Get all price data in the timeframe
-        self.cursor.execute(
-            'SELECT timestamp, price FROM btc_prices WHERE timestamp > ? ORDER BY timestamp',
-            (start_time,)
-        )
-        
-        results = self.cursor.fetchall()
-        self.disconnect()
-        
-        if not results:
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=timeframe_hours)
+        return self.get_btc_ohlc_range(start_time, end_time, interval_minutes=interval_minutes)
+
+    def get_btc_ohlc_range(self, start_time, end_time, interval_minutes=15):
+        """Get BTC candles for the specified time range as a DataFrame
+
+        Returns:
+            DataFrame indexed by candle start with open, high, low, close and timestamp columns
+        """
+        candles = self.get_btc_candles(start_time, end_time, interval_minutes=interval_minutes)
+        if not len(candles['timestamp']):
             return pd.DataFrame()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(results, columns=['timestamp', 'price'])
-        df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
-        
-        # Resample to desired interval
-        interval = f'{interval_minutes}min'
-        ohlc = df.set_index('datetime').resample(interval)['price'].ohlc().dropna()
-        
-        # Add timestamp column back for Plotly
-        ohlc['timestamp'] = ohlc.index.astype(int) // 10**9
-        
+
+        ohlc = pd.DataFrame({name: candles[name] for name in ('open', 'high', 'low', 'close', 'timestamp')},
+                            index=pd.to_datetime(candles['timestamp'], unit='s'))
+        ohlc.index.name = 'datetime'
         return ohlc
-    
+
+    def get_btc_candles(self, start_time, end_time, interval_minutes=15):
+        """Get BTC candles for the specified time range, aggregated inside SQLite
+
+        Reads the coarsest rollup whose interval divides ``interval_minutes``,
+        grouping its candles further when the requested interval is coarser
+        (e.g. 30 minutes from the 15 minute table). Intervals no rollup can
+        serve are aggregated from the raw ticks by ``aggregate_ticks``.
+
+        Args:
+            start_time: datetime object for the start of the range
+            end_time: datetime object for the end of the range
+            interval_minutes: candle width in minutes
+
+        Returns:
+            dict of NumPy arrays: timestamp (candle start), open, high, low, close, count
+        """
+        interval_seconds = int(interval_minutes * 60)
+        candidates = [name for name, seconds in OHLC_ROLLUP_INTERVALS.items()
+                      if interval_seconds and interval_seconds % seconds == 0]
+        if not candidates:
+            return self.aggregate_ticks('btc_prices', start_time, end_time, interval_seconds)
+
+        name = max(candidates, key=OHLC_ROLLUP_INTERVALS.get)
+        table = self._rollup_table(name)
+        self._ensure_rollup_filled(name)
+
+        # Include the candle that contains start_time
+        start_bucket = int(start_time.timestamp() // interval_seconds) * interval_seconds
+        with self._reader() as conn:
+            results = conn.execute(
+                f'''SELECT g.candle,
+                    (SELECT open FROM {table} WHERE bucket = g.first_bucket),
+                    g.high, g.low,
+                    (SELECT close FROM {table} WHERE bucket = g.last_bucket),
+                    g.tick_count
+                FROM (
+                    SELECT bucket / :interval * :interval AS candle,
+                        MAX(high) AS high, MIN(low) AS low, SUM(tick_count) AS tick_count,
+                        MIN(bucket) AS first_bucket, MAX(bucket) AS last_bucket
+                    FROM {table}
+                    WHERE bucket BETWEEN :start AND :end
+                    GROUP BY candle
+                ) AS g
+                ORDER BY g.candle''',
+                {'interval': interval_seconds, 'start': start_bucket, 'end': end_time.timestamp()}
+            ).fetchall()
+
+        data = np.array(results, dtype=np.float64).reshape(-1, 6)
+        candles = {name: data[:, i] for i, name in enumerate(('timestamp', 'open', 'high', 'low', 'close'))}
+        candles['count'] = data[:, 5].astype(np.int64)
+        return candles
+
+    def aggregate_ticks(self, series, start_time, end_time, bucket_seconds):
+        """Aggregate a tick series into fixed time buckets inside SQLite
+
+        Ticks are grouped on integer bucket numbers, so one row per bucket (per
+        partition) reaches Python whatever the tick density. For 'btc_prices'
+        backfilled klines are merged in the way the rollup tables merge them,
+        counting no ticks.
+
+        Args:
+            series: 'btc_prices' or 'mt5_equity'
+            start_time: datetime object for the start of the range
+            end_time: datetime object for the end of the range
+            bucket_seconds: bucket width in seconds
+
+        Returns:
+            dict of NumPy arrays: timestamp (bucket start), open, high, low, close, count;
+            for equity, close, low and high are the last, min and max value of each bucket
+        """
+        bucket_seconds = int(bucket_seconds)
+        if bucket_seconds <= 0:
+            raise ValueError(f"bucket width must be a positive number of seconds: {bucket_seconds}")
+
+        column = TICK_VALUE_COLUMNS[series]
+        time_column = self._time_column
+        start_timestamp = start_time.timestamp()
+        end_timestamp = end_time.timestamp()
+        params = {
+            'seconds': bucket_seconds,
+            'scale': float(self._time_scale),
+            'start': self._time_key(start_timestamp),
+            'end': self._time_key(end_timestamp)
+        }
+
+        rows = []
+        with self._reader() as conn:
+            # One read transaction so the partition list and the reads share a snapshot
+            conn.execute('BEGIN')
+            try:
+                for table in self._tick_tables(conn, series, start_timestamp, end_timestamp):
+                    rows.extend(conn.execute(f'''
+                    SELECT g.bucket,
+                        (SELECT {column} FROM {table} WHERE {time_column} = g.first_key LIMIT 1),
+                        g.high, g.low,
+                        (SELECT {column} FROM {table} WHERE {time_column} = g.last_key LIMIT 1),
+                        g.tick_count, g.first_key / :scale, g.last_key / :scale
+                    FROM (
+                        SELECT CAST({time_column} / (:seconds * :scale) AS INTEGER) * :seconds AS bucket,
+                            MAX({column}) AS high, MIN({column}) AS low, COUNT(*) AS tick_count,
+                            MIN({time_column}) AS first_key, MAX({time_column}) AS last_key
+                        FROM {table}
+                        WHERE {time_column} >= :start AND {time_column} <= :end
+                        GROUP BY bucket
+                    ) AS g
+                    ''', params).fetchall())
+
+                if series == 'btc_prices':
+                    # Klines are keyed by close time but bucketed by open time, like the rollups
+                    rows.extend(conn.execute('''
+                    SELECT g.bucket,
+                        (SELECT open FROM btc_backfill WHERE ts_ms = g.first_key),
+                        g.high, g.low,
+                        (SELECT close FROM btc_backfill WHERE ts_ms = g.last_key),
+                        0, g.first_key / 1000.0 - :candle, g.last_key / 1000.0
+                    FROM (
+                        SELECT CAST((ts_ms / 1000.0 - :candle) / :seconds AS INTEGER) * :seconds AS bucket,
+                            MAX(high) AS high, MIN(low) AS low,
+                            MIN(ts_ms) AS first_key, MAX(ts_ms) AS last_key
+                        FROM btc_backfill
+                        WHERE ts_ms >= :start_ms AND ts_ms <= :end_ms
+                        GROUP BY bucket
+                    ) AS g
+                    ''', {
+                        'seconds': bucket_seconds,
+                        'candle': BACKFILL_CANDLE_SECONDS,
+                        'start_ms': int(start_timestamp * 1000),
+                        'end_ms': int(end_timestamp * 1000)
+                    }).fetchall())
+            finally:
+                conn.execute('COMMIT')
+
+        return self._merge_bucket_rows(rows)
+
+    @staticmethod
+    def _merge_bucket_rows(rows):
+        """Combine (bucket, open, high, low, close, count, first_ts, last_ts) rows from several sources
+
+        A bucket can come from more than one source (a day boundary between
+        partitions, ticks next to backfilled klines); open and close follow the
+        earliest and latest timestamps, as in the rollup tables.
+        """
+        data = np.array(rows, dtype=np.float64).reshape(-1, 8)
+        if not len(data):
+            empty = np.array([], dtype=np.float64)
+            return {'timestamp': empty, 'open': empty, 'high': empty, 'low': empty, 'close': empty,
+                    'count': np.array([], dtype=np.int64)}
+
+        by_first = data[np.lexsort((data[:, 6], data[:, 0]))]
+        by_last = data[np.lexsort((data[:, 7], data[:, 0]))]
+        buckets, starts = np.unique(by_first[:, 0], return_index=True)
+        ends = np.append(starts[1:], len(data)) - 1
+
+        return {
+            'timestamp': buckets,
+            'open': by_first[starts, 1],
+            'high': np.maximum.reduceat(by_first[:, 2], starts),
+            'low': np.minimum.reduceat(by_first[:, 3], starts),
+            'close': by_last[ends, 4],
+            'count': np.add.reduceat(by_first[:, 5], starts).astype(np.int64)
+        }
+
     def get_btc_prices(self, start_time, end_time):
         """Get BTC price data for the specified time range
-        
+
         Args:
             start_time: datetime object for the start of the range
             end_time: datetime object for the end of the range
-            
+
         Returns:
             List of tuples (timestamp, price)
         """
-        self.connect()
-        
         # Convert datetime objects to timestamps
         start_timestamp = start_time.timestamp()
         end_timestamp = end_time.timestamp()
-        
+
         # Query data within the time range
-        self.cursor.execute(
-            'SELECT timestamp, price FROM btc_prices WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp',
-            (start_timestamp, end_timestamp)
-        )
-        
-        results = self.cursor.fetchall()
-        self.disconnect()
-        
+        results = self._query_ticks('btc_prices', 'price', start_timestamp, end_timestamp)
+
+        # Interleave closes of backfilled candles so gaps in the ticks are not drawn as straight lines
+        with self._reader() as conn:
+            backfill = conn.execute(
+                'SELECT ts_ms / 1000.0, close FROM btc_backfill WHERE ts_ms >= ? AND ts_ms <= ? ORDER BY ts_ms',
+                (int(start_timestamp * 1000), int(end_timestamp * 1000))
+            ).fetchall()
+        if backfill:
+            results = list(heapq.merge(results, backfill))
+
         return results
-    
+
+    def find_btc_gaps(self, start_time, min_gap=90.0):
+        """Find holes in the BTC tick series that have not been backfilled yet
+
+        Args:
+            start_time: unix timestamp to scan from (the last tick before it counts as the gap start)
+            min_gap: shortest hole in seconds that is reported
+
+        Returns:
+            List of (gap_start, gap_end) unix timestamps of the ticks bordering each hole
+        """
+        column = self._time_column
+        scale = self._time_scale
+        start_key = self._time_key(start_time)
+        min_gap_key = min_gap * scale
+
+        gaps = []
+        with self._reader() as conn:
+            conn.execute('BEGIN')
+            try:
+                # Seed with the last tick before the window so a hole spanning its start is found
+                previous = None
+                for table in reversed(self._tick_tables(conn, 'btc_prices', end_timestamp=start_time)):
+                    previous = conn.execute(
+                        f'SELECT MAX({column}) FROM {table} WHERE {column} < ?', (start_key,)
+                    ).fetchone()[0]
+                    if previous is not None:
+                        break
+
+                for table in self._tick_tables(conn, 'btc_prices', start_timestamp=start_time):
+                    first, last = conn.execute(
+                        f'SELECT MIN({column}), MAX({column}) FROM {table} WHERE {column} >= ?', (start_key,)
+                    ).fetchone()
+                    if first is None:
+                        continue
+                    # Holes between partitions, then inside this one
+                    if previous is not None and first - previous > min_gap_key:
+                        gaps.append((previous / scale, first / scale))
+                    gaps.extend(
+                        (prev / scale, key / scale)
+                        for prev, key in conn.execute(
+                            f'''SELECT prev, key FROM (
+                                SELECT {column} AS key, LAG({column}) OVER (ORDER BY {column}) AS prev
+                                FROM {table} WHERE {column} >= ?
+                            ) WHERE key - prev > ?''',
+                            (start_key, min_gap_key)
+                        )
+                    )
+                    previous = last
+
+                filled = conn.execute('SELECT start_ts, end_ts FROM btc_backfill_ranges').fetchall()
+            finally:
+                conn.execute('COMMIT')
+
+        return [
+            (gap_start, gap_end) for gap_start, gap_end in gaps
+            if not any(start <= gap_start and gap_end <= end for start, end in filled)
+        ]
+
+    def save_btc_backfill(self, gap_start, gap_end, candles):
+        """Store klines fetched for a gap and fold them into the rollup tables
+
+        Written directly in one transaction rather than through the write-behind
+        queue, since a backfill can be thousands of rows. The range is recorded
+        even when no candles were returned so it is not requested again.
+
+        Args:
+            gap_start: unix timestamp of the tick before the gap
+            gap_end: unix timestamp of the tick after the gap
+            candles: iterable of (open_time, open, high, low, close, volume, close_time),
+                times in unix seconds
+        """
+        candles = list(candles)
+        with self._writer() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO btc_backfill (ts_ms, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?)',
+                [(int(close_time * 1000), o, h, l, c, v) for _, o, h, l, c, v, close_time in candles]
+            )
+            # Backfilled candles carry no ticks; merging them again is a no-op
+            for name, seconds in OHLC_ROLLUP_INTERVALS.items():
+                conn.executemany(
+                    self._rollup_upsert_sql(self._rollup_table(name)),
+                    [(int(open_time // seconds) * seconds, o, h, l, c, 0, open_time, close_time)
+                     for open_time, o, h, l, c, _, close_time in candles]
+                )
+            conn.execute(
+                'INSERT OR REPLACE INTO btc_backfill_ranges (start_ts, end_ts, candles, filled_at) VALUES (?, ?, ?, ?)',
+                (gap_start, gap_end, len(candles), time.time())
+            )
+        return len(candles)
+
+    def get_symbol_prices(self, symbol, start_time, end_time):
+        """Get price data for any watched symbol in the specified time range
+
+        Returns:
+            List of tuples (timestamp, price)
+        """
+        if symbol == PRIMARY_SYMBOL:
+            return self.get_btc_prices(start_time, end_time)
+
+        start_timestamp = start_time.timestamp()
+        end_timestamp = end_time.timestamp()
+        results = []
+        with self._reader() as conn:
+            # One read transaction so the partition list and the reads share a snapshot
+            conn.execute('BEGIN')
+            try:
+                for table in self._tick_tables(conn, 'symbol_prices', start_timestamp, end_timestamp):
+                    results.extend(conn.execute(
+                        f'''SELECT ts_ms / 1000.0, price FROM {table}
+                        WHERE symbol = ? AND ts_ms >= ? AND ts_ms <= ? ORDER BY ts_ms''',
+                        (symbol, int(start_timestamp * 1000), int(end_timestamp * 1000))
+                    ).fetchall())
+            finally:
+                conn.execute('COMMIT')
+        return results
+
     def get_mt5_equity(self, start_time, end_time):
         """Get MT5 equity data for the specified time range
-        
+
         Args:
             start_time: datetime object for the start of the range
             end_time: datetime object for the end of the range
-            
+
         Returns:
             List of tuples (timestamp, equity, position)
         """
-        self.connect()
-        
         # Convert datetime objects to timestamps
         start_timestamp = start_time.timestamp()
         end_timestamp = end_time.timestamp()
-        
+
         # Query data within the time range
-        self.cursor.execute(
-            'SELECT timestamp, equity, position FROM mt5_equity WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp',
-            (start_timestamp, end_timestamp)
-        )
-        
-        results = self.cursor.fetchall()
-        self.disconnect()
-        
+        results = self._query_ticks('mt5_equity', 'equity, position', start_timestamp, end_timestamp)
+
         return results
-        
+
     def clean_old_data(self, max_days=7):
-        """Clean data older than max_days to prevent database bloat"""
-        self.connect()
-        
+        """Clean data older than max_days to prevent database bloat
+
+        In partitioned mode whole daily partitions (of BTC, MT5 and the other
+        symbols) that end before the cutoff are dropped, so the cost does not
+        depend on how many rows expire.
+
+        Returns:
+            Tuple (deleted BTC rows, deleted MT5 rows)
+        """
         # Calculate cutoff timestamp
         cutoff_time = time.time() - (max_days * 24 * 60 * 60)
-        
+
         # Delete old data
-        self.cursor.execute('DELETE FROM btc_prices WHERE timestamp < ?', (cutoff_time,))
-        self.cursor.execute('DELETE FROM mt5_equity WHERE timestamp < ?', (cutoff_time,))
-        
-        # Get number of deleted rows
-        deleted_btc = self.cursor.rowcount
-        deleted_mt5 = self.cursor.rowcount
-        
-        self.conn.commit()
-        self.disconnect()
-        
+        with self._writer() as conn:
+            if self.partitioned:
+                deleted = {series: 0 for series in list(COMPACT_TABLE_COLUMNS) + ['symbol_prices']}
+                expired = conn.execute(
+                    'SELECT series, day, row_count FROM tick_partitions WHERE end_ts <= ?',
+                    (cutoff_time,)
+                ).fetchall()
+                for series, day, row_count in expired:
+                    conn.execute(f'DROP TABLE IF EXISTS {series}_{day}')
+                    deleted[series] += row_count
+                    self._partitions.discard(f'{series}_{day}')
+                conn.execute('DELETE FROM tick_partitions WHERE end_ts <= ?', (cutoff_time,))
+                deleted_btc = deleted['btc_prices']
+                deleted_mt5 = deleted['mt5_equity']
+                deleted_symbols = deleted['symbol_prices']
+            else:
+                cutoff_key = self._time_key(cutoff_time)
+                deleted_btc = conn.execute(
+                    f'DELETE FROM btc_prices WHERE {self._time_column} < ?', (cutoff_key,)
+                ).rowcount
+                deleted_mt5 = conn.execute(
+                    f'DELETE FROM mt5_equity WHERE {self._time_column} < ?', (cutoff_key,)
+                ).rowcount
+                deleted_symbols = conn.execute(
+                    'DELETE FROM symbol_prices WHERE ts_ms < ?', (int(cutoff_time * 1000),)
+                ).rowcount
+
+            if deleted_symbols > 0:
+                logger.info(f"Cleaned {deleted_symbols} old rows from symbol_prices")
+
+            conn.execute('DELETE FROM btc_backfill WHERE ts_ms < ?', (int(cutoff_time * 1000),))
+            conn.execute('DELETE FROM btc_backfill_ranges WHERE end_ts < ?', (cutoff_time,))
+
+            # Candles are kept for the same period as the ticks they summarise
+            for name, seconds in OHLC_ROLLUP_INTERVALS.items():
+                conn.execute(
+                    f'DELETE FROM {self._rollup_table(name)} WHERE bucket < ?',
+                    (int(cutoff_time // seconds) * seconds,)
+                )
+
         return deleted_btc, deleted_mt5
@@ -0,0 +1,85 @@
+import numpy as np
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+
+def _bucket_edges(start, stop, buckets):
+    """Index edges splitting [start, stop) into ``buckets`` nearly equal runs"""
+    return np.linspace(start, stop, buckets + 1).astype(np.int64)
+
+
+def _bucket_matrix(values, edges, fill):
+    """Pad the runs between ``edges`` into rows of one 2-D array, so reductions run per row"""
+    sizes = np.diff(edges)
+    positions = edges[:-1, None] + np.arange(sizes.max())
+    inside = positions < edges[1:, None]
+    rows = np.where(inside, values[np.minimum(positions, len(values) - 1)], fill)
+    return positions, inside, rows
+
+
+def minmax_indices(y, points):
+    """Indices of the lowest and highest value in each of ``points // 2`` buckets, in order
+
+    Every peak and trough survives, so spikes stay visible however far the
+    series is reduced.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    buckets = max(1, points // 2)
+    if len(y) <= points:
+        return np.arange(len(y))
+
+    edges = _bucket_edges(0, len(y), buckets)
+    positions, _, low = _bucket_matrix(y, edges, np.inf)
+    high = np.where(np.isinf(low), -np.inf, low)
+    rows = np.arange(buckets)
+    lowest = positions[rows, np.argmin(low, axis=1)]
+    highest = positions[rows, np.argmax(high, axis=1)]
+
+    # Keep each bucket's pair in time order; a flat bucket gives the same index twice
+    return np.unique(np.stack([lowest, highest], axis=1))
+
+
+def lttb_indices(x, y, points):
+    """Indices picked by Largest-Triangle-Three-Buckets
+
+    Keeps the first and last point and, from each bucket in between, the point
+    forming the largest triangle with the point kept from the previous bucket
+    and the average of the next one. The choice depends on the previous
+    bucket, so buckets are visited in turn, but each is evaluated as a whole
+    array.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= points or points < 3:
+        return np.arange(n)
+
+    # Interior points only; the first and last are always kept
+    edges = _bucket_edges(1, n - 1, points - 2)
+    positions, inside, _ = _bucket_matrix(y, edges, 0.0)
+    sizes = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1)[1:] / sizes[1:], x[-1])
+    next_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1)[1:] / sizes[1:], y[-1])
+    bucket_x = x[np.minimum(positions, n - 1)]
+    bucket_y = y[np.minimum(positions, n - 1)]
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        area = np.abs((x[previous] - next_x[bucket]) * (bucket_y[bucket] - y[previous])
+                      - (x[previous] - bucket_x[bucket]) * (next_y[bucket] - y[previous]))
+        area[~inside[bucket]] = -1.0
+        previous = positions[bucket, np.argmax(area)]
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(x, y, points, method='lttb'):
+    """Reduce a series to at most ``points`` points; returns (x, y) arrays"""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"unknown downsampling method: {method}")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    indices = lttb_indices(x, y, points) if method == 'lttb' else minmax_indices(y, points)
+    return x[indices], y[indices]
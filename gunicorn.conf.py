@@ -0,0 +1,80 @@
+# gunicorn settings for running several web workers against one collector.
+# The master starts collector.py and restarts it whenever it exits; every
+# worker follows it over COLLECTOR_SOCKET instead of collecting on its own.
+import os
+import sys
+import time
+import threading
+import subprocess
+
+# Inherited by the workers forked after this file is loaded
+os.environ.setdefault('COLLECTOR_MODE', 'external')
+
+COLLECTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'collector.py')
+COLLECTOR_CHECK_INTERVAL = 2  # seconds between liveness checks of the collector process
+COLLECTOR_RESTART_DELAY = 1  # first restart delay; doubles while the collector keeps crashing
+COLLECTOR_MAX_RESTART_DELAY = 60
+COLLECTOR_STABLE_AFTER = 60  # seconds up before the restart delay resets
+
+collector_process = None
+collector_started = 0
+collector_lock = threading.Lock()
+stopping = threading.Event()
+
+
+def start_collector(server):
+    global collector_process, collector_started
+    collector_process = subprocess.Popen([sys.executable, COLLECTOR_PATH])
+    collector_started = time.monotonic()
+    server.log.info(f"Started collector (pid {collector_process.pid})")
+
+
+def ensure_collector(server):
+    """Start the collector again if it has exited; returns True if it had to"""
+    with collector_lock:
+        if stopping.is_set() or collector_process is None or collector_process.poll() is None:
+            return False
+        # No exit code: the arbiter reaps every child, so Popen may only see that it is gone
+        server.log.error(f"Collector (pid {collector_process.pid}) exited; restarting")
+        start_collector(server)
+        return True
+
+
+def supervise_collector(server):
+    delay = COLLECTOR_RESTART_DELAY
+    while not stopping.wait(COLLECTOR_CHECK_INTERVAL):
+        if collector_process.poll() is None:
+            if time.monotonic() - collector_started > COLLECTOR_STABLE_AFTER:
+                delay = COLLECTOR_RESTART_DELAY
+            continue
+        # Back off while it keeps crashing (e.g. on startup) instead of restarting in a tight loop
+        if stopping.wait(delay):
+            break
+        ensure_collector(server)
+        delay = min(COLLECTOR_MAX_RESTART_DELAY, delay * 2)
+
+
+def on_starting(server):
+    if os.environ['COLLECTOR_MODE'] == 'external':
+        start_collector(server)
+
+
+def when_ready(server):
+    if collector_process is not None:
+        threading.Thread(target=supervise_collector, args=(server,), name='collector-supervisor',
+                         daemon=True).start()
+
+
+def on_reload(server):
+    ensure_collector(server)
+
+
+def on_exit(server):
+    stopping.set()
+    with collector_lock:
+        if collector_process is not None and collector_process.poll() is None:
+            collector_process.terminate()
+            try:
+                collector_process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                collector_process.kill()
@@ -0,0 +1,495 @@
+import json
+import time
+import threading
+import weakref
+from collections import namedtuple
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+# Result of RingBuffer.snapshot: ``count`` is the total number of rows ever
+# appended when the snapshot was taken and ``data`` maps column -> array view.
+Snapshot = namedtuple('Snapshot', ['count', 'data'])
+
+# How long a reader waits on a write that never completes (a writer process killed mid-append)
+WRITE_STALL_TIMEOUT = 1.0
+
+
+def _wait_for_write(header):
+    """Sequence number at header[0] once no write is in progress"""
+    seq = int(header[0])
+    if seq % 2:
+        deadline = time.monotonic() + WRITE_STALL_TIMEOUT
+        while seq % 2:
+            if time.monotonic() > deadline:
+                raise TimeoutError("writer stalled in the middle of an update")
+            time.sleep(0)
+            seq = int(header[0])
+    return seq
+
+
+def _new_epoch():
+    """Identifier of a newly created buffer: the current time in milliseconds"""
+    return int(time.time() * 1000)
+
+
+def _attach_segment(name):
+    """Open an existing shared memory segment without taking ownership of it"""
+    segment = shared_memory.SharedMemory(name=name)
+    # Python < 3.13 registers every attach with the resource tracker, which would
+    # unlink the segment when this (reader) process exits
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def _close_segment(segment, arrays):
+    """Close a segment's mapping unless one of its arrays (weak references) is still alive
+
+    NumPy releases its buffer export as soon as an array is built on the segment,
+    so the mapping itself cannot tell that views into it are still in use.
+    """
+    if any(array() is not None for array in arrays):
+        return False
+    segment.close()
+    return True
+
+
+def _create_segment(name, size):
+    """Create a shared memory segment, replacing one left behind by a crashed writer"""
+    try:
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+    except FileNotFoundError:
+        pass
+    return shared_memory.SharedMemory(name=name, create=True, size=size)
+
+
+class RingBuffer:
+    """Fixed-capacity, array-backed buffer for the live chart series.
+
+    Every column is stored twice in a mirrored NumPy array, so the newest ``n``
+    rows are always one contiguous slice and can be handed out as a read-only
+    view without copying. Appends are O(1) (two element writes per column) and
+    never reallocate.
+
+    A single writer is serialized with a lock; readers use a sequence counter
+    (seqlock) instead of the lock, so chart requests never stall the ingestion
+    loop. The physical ring has one spare slot, so a snapshot view stays
+    untouched by at least the next append even when it spans the full capacity.
+
+    ``count`` starts from 0 in every new buffer; ``epoch`` (creation time in
+    milliseconds) tells counts of different buffers apart.
+    """
+
+    def __init__(self, capacity, columns=('timestamp', 'value'), dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = int(capacity)
+        self.columns = tuple(columns)
+        self.epoch = _new_epoch()
+        self._slots = self.capacity + 1
+        # [sequence, count]; kept in an array so the buffer can live in shared memory
+        self._header = np.zeros(2, dtype=np.int64)
+        self._data = {name: np.zeros(2 * self._slots, dtype=dtype) for name in self.columns}
+        self._write_lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def count(self):
+        """Total number of rows appended since the buffer was created"""
+        return int(self._header[1])
+
+    def append(self, **values):
+        """Append one row; columns that are not given repeat their previous value"""
+        header = self._header
+        with self._write_lock:
+            count = int(header[1])
+            pos = count % self._slots
+            previous = (count - 1) % self._slots
+
+            # Odd sequence numbers tell readers a write is in progress
+            header[0] += 1
+            for name, column in self._data.items():
+                if name in values:
+                    value = values[name]
+                elif count:
+                    value = column[previous]
+                else:
+                    value = 0
+                column[pos] = value
+                column[pos + self._slots] = value
+            header[1] = count + 1
+            header[0] += 1
+
+    def last(self, column, default=0):
+        """Most recent value of a column, or ``default`` if the buffer is empty"""
+        header = self._header
+        while True:
+            seq = _wait_for_write(header)
+            count = int(header[1])
+            if not count:
+                return default
+            value = self._data[column][(count - 1) % self._slots]
+            if seq == header[0]:
+                return value.item()
+
+    def snapshot(self, n=None, copy=False):
+        """Return a consistent view of the newest ``n`` rows (all rows by default)
+
+        The arrays are read-only views into the buffer unless ``copy`` is True.
+        Views are guaranteed not to change until the next append; copy them if
+        they must be kept longer than that.
+
+        Returns:
+            Snapshot(count, data) where data maps column name to a NumPy array
+        """
+        header = self._header
+        while True:
+            seq = _wait_for_write(header)
+
+            count = int(header[1])
+            size = min(count, self.capacity)
+            if n is not None:
+                size = min(size, max(0, int(n)))
+
+            end = count % self._slots + self._slots
+            data = {}
+            for name, column in self._data.items():
+                view = column[end - size:end]
+                if copy:
+                    view = view.copy()
+                else:
+                    view = view.view()
+                    view.flags.writeable = False
+                data[name] = view
+
+            if seq == header[0]:
+                return Snapshot(count, data)
+
+
+class SharedRingBuffer(RingBuffer):
+    """RingBuffer whose counters and columns live in a named shared memory segment.
+
+    The writer process ``create``s the segment and appends as usual; any number
+    of other processes ``attach`` to it by name and read with the same seqlock,
+    so every process sees the same rows and counts without copying or IPC per
+    read. The segment starts with the layout (capacity and column names), so
+    readers need nothing but the name. Only one process may write.
+    """
+
+    # [sequence, count, capacity, length of the JSON column list, epoch]
+    HEADER_FIELDS = 5
+
+    def __init__(self, segment, capacity, columns, dtype=np.float64, owner=False):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.segment = segment
+        self.owner = owner
+        self.capacity = int(capacity)
+        self.columns = tuple(columns)
+        self._slots = self.capacity + 1
+        self._write_lock = threading.Lock()
+
+        header_bytes = self.HEADER_FIELDS * 8
+        layout = np.ndarray(self.HEADER_FIELDS, dtype=np.int64, buffer=segment.buf)
+        names_bytes, self.epoch = int(layout[3]), int(layout[4])
+        del layout
+        offset = header_bytes + (names_bytes + 7) // 8 * 8
+        column_bytes = 2 * self._slots * np.dtype(dtype).itemsize
+
+        self._header = np.ndarray(2, dtype=np.int64, buffer=segment.buf)
+        self._data = {}
+        for index, name in enumerate(self.columns):
+            self._data[name] = np.ndarray(2 * self._slots, dtype=dtype, buffer=segment.buf,
+                                          offset=offset + index * column_bytes)
+
+    @property
+    def name(self):
+        return self.segment.name
+
+    @classmethod
+    def create(cls, name, capacity, columns=('timestamp', 'value'), dtype=np.float64):
+        """Create (or replace) the named segment and return the writer's buffer"""
+        names = json.dumps(list(columns)).encode()
+        header_bytes = cls.HEADER_FIELDS * 8 + (len(names) + 7) // 8 * 8
+        size = header_bytes + len(columns) * 2 * (int(capacity) + 1) * np.dtype(dtype).itemsize
+
+        segment = _create_segment(name, size)
+        header = np.ndarray(cls.HEADER_FIELDS, dtype=np.int64, buffer=segment.buf)
+        header[:] = (0, 0, int(capacity), len(names), _new_epoch())
+        segment.buf[cls.HEADER_FIELDS * 8:cls.HEADER_FIELDS * 8 + len(names)] = names
+        del header
+        return cls(segment, capacity, columns, dtype, owner=True)
+
+    @classmethod
+    def attach(cls, name, dtype=np.float64):
+        """Open a buffer created by another process for reading"""
+        segment = _attach_segment(name)
+        header = np.ndarray(cls.HEADER_FIELDS, dtype=np.int64, buffer=segment.buf)
+        capacity, names_bytes = int(header[2]), int(header[3])
+        del header
+        start = cls.HEADER_FIELDS * 8
+        columns = json.loads(bytes(segment.buf[start:start + names_bytes]))
+        return cls(segment, capacity, columns, dtype)
+
+    def unlink(self):
+        """Remove the segment name (writer only); attached readers keep their mapping"""
+        if self.owner:
+            self.segment.unlink()
+
+    def close(self):
+        """Unmap the segment from this process; False (call again later) while snapshot views are alive"""
+        if self._header is not None:
+            self._arrays = [weakref.ref(array) for array in (self._header, *self._data.values())]
+            self._header, self._data = None, {}
+        return _close_segment(self.segment, self._arrays)
+
+
+class SharedSnapshot:
+    """A small JSON document in shared memory, written by one process and read by many.
+
+    Used for state that is replaced as a whole rather than appended, such as the
+    current position. Writes and reads use the same seqlock as RingBuffer.
+    """
+
+    # [sequence, length of the JSON document]
+    HEADER_BYTES = 16
+
+    def __init__(self, segment, owner=False):
+        self.segment = segment
+        self.owner = owner
+        self.size = segment.size - self.HEADER_BYTES
+        self._header = np.ndarray(2, dtype=np.int64, buffer=segment.buf)
+        self._write_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.segment.name
+
+    @classmethod
+    def create(cls, name, size=16384):
+        return cls(_create_segment(name, cls.HEADER_BYTES + size), owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach_segment(name))
+
+    def write(self, value):
+        """Replace the document; raises ValueError if it does not fit"""
+        document = json.dumps(value, default=str).encode()
+        if len(document) > self.size:
+            raise ValueError(f"shared snapshot of {len(document)} bytes exceeds {self.size}")
+        with self._write_lock:
+            self._header[0] += 1
+            self.segment.buf[self.HEADER_BYTES:self.HEADER_BYTES + len(document)] = document
+            self._header[1] = len(document)
+            self._header[0] += 1
+
+    def read(self, default=None):
+        """The current document, or ``default`` if nothing has been written yet"""
+        header = self._header
+        while True:
+            seq = _wait_for_write(header)
+            length = int(header[1])
+            document = bytes(self.segment.buf[self.HEADER_BYTES:self.HEADER_BYTES + length])
+            if seq == header[0]:
+                return json.loads(document) if length else default
+
+    def unlink(self):
+        if self.owner:
+            self.segment.unlink()
+
+    def close(self):
+        """Unmap the segment from this process; False (call again later) while a read is in progress"""
+        if self._header is not None:
+            self._arrays = [weakref.ref(self._header)]
+            self._header = None
+        return _close_segment(self.segment, self._arrays)
+
+
+class _Tier:
+    """One resolution level of a TieredSeries"""
+
+    __slots__ = ('name', 'resolution', 'span', 'buffer', 'pending')
+
+    def __init__(self, name, resolution, span, columns):
+        self.name = name
+        self.resolution = resolution
+        self.span = span
+        self.buffer = RingBuffer(int(span // resolution), columns=columns)
+        self.pending = None
+
+
+class TieredSeries:
+    """In-memory history at several resolutions, fed by the same ingestion loop.
+
+    Each tier keeps a ring buffer of fixed-width buckets. Ticks are folded into
+    the open bucket of every tier as they arrive and the bucket is appended to
+    its ring when the next bucket starts, so coarser tiers are downsampled
+    incrementally instead of being recomputed from the raw series.
+
+    Columns listed in ``ohlc_columns`` keep open/high/low/close per bucket
+    (``<name>_open``, ``<name>_high``, ``<name>_low`` and ``<name>`` as the
+    close) so candles can be built from any tier; other columns keep the last
+    value seen in the bucket. A column missing from a bucket's ticks carries
+    its last value forward, and its candle stays flat at that value until a
+    tick for it arrives.
+
+    Ticks from different threads may arrive slightly out of order. A late tick
+    only widens the high/low of the open bucket (the close stays with the
+    newest tick of each column). One older than the open bucket is folded into
+    the open bucket as well, never into one already closed, so a sample is not
+    lost because another source opened the next bucket first; such ticks are
+    counted in ``late_ticks``.
+    """
+
+    # (name, bucket width in seconds, span in seconds)
+    DEFAULT_TIERS = (
+        ('1s', 1, 5 * 60),
+        ('10s', 10, 6 * 60 * 60),
+        ('1m', 60, 24 * 60 * 60)
+    )
+
+    def __init__(self, columns=('value',), ohlc_columns=(), tiers=DEFAULT_TIERS):
+        self.value_columns = tuple(columns)
+        self.ohlc_columns = tuple(ohlc_columns)
+
+        stored = ['timestamp']
+        for name in self.value_columns:
+            if name in self.ohlc_columns:
+                stored.extend([f'{name}_open', f'{name}_high', f'{name}_low'])
+            stored.append(name)
+        self.stored_columns = tuple(stored)
+
+        self._tiers = [_Tier(name, resolution, span, self.stored_columns)
+                       for name, resolution, span in sorted(tiers, key=lambda tier: tier[1])]
+        self._latest = {}
+        self.late_ticks = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_span(self):
+        """Longest window, in seconds, that any tier can hold"""
+        return max(tier.span for tier in self._tiers)
+
+    def tier(self, name):
+        """Ring buffer of closed buckets for the named tier"""
+        for tier in self._tiers:
+            if tier.name == name:
+                return tier.buffer
+        raise KeyError(name)
+
+    def append(self, timestamp, **values):
+        """Fold one tick into the open bucket of every tier"""
+        with self._lock:
+            # Columns this tick is the newest value of; an older tick never moves the close
+            newest = {name for name in values if timestamp >= self._latest.get(name, timestamp)}
+            for name in newest:
+                self._latest[name] = timestamp
+
+            for tier in self._tiers:
+                bucket = timestamp // tier.resolution * tier.resolution
+                pending = tier.pending
+
+                # A bucket already closed into the ring is never reopened
+                if pending is not None and bucket < pending['timestamp']:
+                    self.late_ticks += 1
+                    bucket = pending['timestamp']
+
+                # A tick in a new bucket closes the previous one
+                if pending is not None and bucket != pending['timestamp']:
+                    tier.buffer.append(**self._bucket_row(pending))
+                    # Only the last value of each column carries forward, never its extremes
+                    pending = {name: pending[name] for name in self.value_columns if name in pending}
+                    pending['timestamp'] = bucket
+                elif pending is None:
+                    pending = {'timestamp': bucket}
+
+                for name, value in values.items():
+                    if name in self.ohlc_columns:
+                        if f'{name}_open' in pending:
+                            pending[f'{name}_high'] = max(pending[f'{name}_high'], value)
+                            pending[f'{name}_low'] = min(pending[f'{name}_low'], value)
+                        else:
+                            # First tick of this column in the bucket
+                            pending[f'{name}_open'] = value
+                            pending[f'{name}_high'] = value
+                            pending[f'{name}_low'] = value
+                    if name in newest or name not in pending:
+                        pending[name] = value
+                tier.pending = pending
+
+    def _bucket_row(self, pending):
+        """A bucket as stored: OHLC columns without a tick in it are flat at their last value"""
+        row = dict(pending)
+        for name in self.ohlc_columns:
+            if name in row and f'{name}_open' not in row:
+                row[f'{name}_open'] = row[f'{name}_high'] = row[f'{name}_low'] = row[name]
+        return row
+
+    def window(self, seconds, now=None, require_full=False):
+        """Rows covering the last ``seconds`` from the finest tier that spans them
+
+        The still-open bucket is included as the last row so the window is as
+        fresh as the latest tick.
+
+        Args:
+            seconds: length of the window
+            now: end of the window in unix seconds (defaults to the current time)
+            require_full: return None unless the tier holds data for the whole window
+
+        Returns:
+            dict mapping column name to a NumPy array (plus 'tier' with the tier name),
+            or None if ``require_full`` is set and memory does not cover the window
+        """
+        now = time.time() if now is None else now
+        start = now - seconds
+        tier = next((tier for tier in self._tiers if tier.span >= seconds), self._tiers[-1])
+
+        with self._lock:
+            snapshot = tier.buffer.snapshot()
+            pending = tier.pending
+            if pending is not None:
+                pending = self._bucket_row(pending)
+                data = {name: np.append(snapshot.data[name], pending.get(name, 0))
+                        for name in self.stored_columns}
+            else:
+                data = {name: snapshot.data[name].copy() for name in self.stored_columns}
+
+        timestamps = data['timestamp']
+        if require_full and (not len(timestamps) or timestamps[0] > start + tier.resolution):
+            return None
+
+        first = np.searchsorted(timestamps, start // tier.resolution * tier.resolution)
+        result = {name: values[first:] for name, values in data.items()}
+        result['tier'] = tier.name
+        return result
+
+    @staticmethod
+    def candles(window, interval_seconds, column):
+        """Aggregate a window's buckets into OHLC candles of ``interval_seconds``
+
+        Returns:
+            dict with 'timestamp', 'open', 'high', 'low' and 'close' NumPy arrays
+        """
+        timestamps = window['timestamp']
+        if not len(timestamps):
+            empty = np.array([], dtype=np.float64)
+            return {'timestamp': empty, 'open': empty, 'high': empty, 'low': empty, 'close': empty}
+
+        buckets = timestamps // interval_seconds * interval_seconds
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+
+        return {
+            'timestamp': buckets[starts],
+            'open': window[f'{column}_open'][starts],
+            'high': np.maximum.reduceat(window[f'{column}_high'], starts),
+            'low': np.minimum.reduceat(window[f'{column}_low'], starts),
+            'close': window[column][ends]
+        }
@@ -0,0 +1,134 @@
+import json
+import queue
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger('live_events')
+
+
+def sse_frame(event_id, event_type, data):
+    """Server-Sent Events wire format for one event"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    """One connected client's queue of pre-serialized frames"""
+
+    def __init__(self, broadcaster, max_queue):
+        self.broadcaster = broadcaster
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def get(self, timeout=None):
+        """Next frame, or None on timeout. Raises StopIteration once the subscription is closed"""
+        if self.closed and self.queue.empty():
+            raise StopIteration
+        try:
+            frame = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if frame is None:
+            raise StopIteration
+        return frame
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class EventBroadcaster:
+    """Single-producer, many-subscriber fan-out for Server-Sent Events.
+
+    ``publish`` serializes each event exactly once into an SSE frame and hands
+    the same string to every subscriber, so the cost per event does not grow
+    with the number of connected clients beyond a queue put. A subscriber whose
+    queue fills up (a stalled tab) is disconnected rather than slowing the
+    producer; the browser's EventSource reconnects and replays what it missed
+    from the recent-history window using ``Last-Event-ID``.
+
+    ``encode(event_id, event_type, data)`` builds the frame; it defaults to the
+    SSE format, other transports pass their own. Ids count up from
+    ``first_id``; a broadcaster relaying another one's events passes their ids
+    to ``publish`` instead.
+    """
+
+    def __init__(self, max_queue=256, history_size=512, encode=sse_frame, first_id=0):
+        self.max_queue = max_queue
+        self.encode = encode
+        self._subscribers = set()
+        self._history = deque(maxlen=history_size)
+        self._sequence = first_id
+        self._lock = threading.Lock()
+
+    @property
+    def sequence(self):
+        """Id of the most recently published event"""
+        return self._sequence
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event_type, data, event_id=None):
+        """Serialize an event once and queue it for every subscriber
+
+        Args:
+            event_id: id to publish under (must be higher than the last one); the next in sequence by default
+
+        Returns:
+            int: the event id
+        """
+        with self._lock:
+            self._sequence = event_id if event_id is not None else self._sequence + 1
+            event_id = self._sequence
+            frame = self.encode(event_id, event_type, data)
+            self._history.append((event_id, frame))
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(frame)
+            except queue.Full:
+                logger.warning("Dropping slow event stream subscriber")
+                self.unsubscribe(subscription)
+        return event_id
+
+    def subscribe(self, last_event_id=None):
+        """Register a new subscriber, replaying events after ``last_event_id`` if still held"""
+        subscription = Subscription(self, self.max_queue)
+        with self._lock:
+            if last_event_id is not None:
+                for event_id, frame in self._history:
+                    if event_id > last_event_id:
+                        try:
+                            subscription.queue.put_nowait(frame)
+                        except queue.Full:
+                            break
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        if not subscription.closed:
+            subscription.closed = True
+            try:
+                # Wake up the consumer so its stream ends promptly
+                subscription.queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def stream(self, last_event_id=None, heartbeat=15):
+        """Generator of SSE frames for one HTTP response, with keep-alive comments"""
+        subscription = self.subscribe(last_event_id)
+        try:
+            # Tell EventSource how quickly to reconnect if the stream drops
+            yield "retry: 2000\n\n"
+            while True:
+                try:
+                    frame = subscription.get(timeout=heartbeat)
+                except StopIteration:
+                    return
+                yield frame if frame is not None else ": keep-alive\n\n"
+        finally:
+            subscription.close()
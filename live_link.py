@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from live_events import EventBroadcaster
+
+logger = logging.getLogger('live_link')
+
+
+def json_line(event_id, event_type, data):
+    """One event as a line of JSON"""
+    return json.dumps({'id': event_id, 'type': event_type, 'data': data}, default=str) + '\n'
+
+
+class LiveLinkServer:
+    """Serves the collector's live state and events to web worker processes over a Unix socket.
+
+    A worker opens with a hello line, ``{"since": <last event id or null>}``.
+    It then receives a ``snapshot`` line built by ``snapshot()``, the events
+    after ``since`` that are still in the last ``history_size``, and every
+    event passed to ``publish`` from then on, one JSON object per line. An
+    idle connection gets an empty line every ``heartbeat`` seconds so the
+    worker can tell a quiet collector from a dead one.
+
+    Events are fanned out through an EventBroadcaster, so a worker that stops
+    reading is dropped once ``max_queue`` events are waiting for it (or a
+    write blocks for ``send_timeout`` seconds) instead of slowing the
+    collector; it reconnects and replays what it missed. Event ids start at
+    the current time in milliseconds, so they keep increasing across collector
+    restarts and a worker's position stays valid.
+    """
+
+    def __init__(self, path, snapshot, max_queue=2048, history_size=2048, heartbeat=5.0, send_timeout=30.0):
+        self.path = path
+        self.snapshot = snapshot
+        self.heartbeat = heartbeat
+        self.send_timeout = send_timeout
+        self.events = EventBroadcaster(max_queue=max_queue, history_size=history_size, encode=json_line,
+                                       first_id=int(time.time() * 1000))
+        self._socket = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def connections(self):
+        return self.events.subscriber_count
+
+    def publish(self, event_type, data):
+        return self.events.publish(event_type, data)
+
+    @staticmethod
+    def in_use(path):
+        """True if a running server is accepting connections on ``path``"""
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+
+    def start(self):
+        """Bind the socket and accept workers in a background thread"""
+        # Refuse to take over the socket of a collector that is still running
+        if self.in_use(self.path):
+            raise RuntimeError(f"a collector is already serving {self.path}")
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._stopping.clear()
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(self.path)
+        self._socket.listen(64)
+        self._thread = threading.Thread(target=self._accept, name='live-link', daemon=True)
+        self._thread.start()
+        logger.info(f"Live link serving on {self.path}")
+
+    def stop(self):
+        self._stopping.set()
+        if self._socket is not None:
+            # shutdown() wakes the thread blocked in accept(); close() alone does not
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _accept(self):
+        while not self._stopping.is_set():
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), name='live-link-conn', daemon=True).start()
+
+    def _serve(self, conn):
+        subscription = None
+        try:
+            conn.settimeout(self.send_timeout)
+            with conn.makefile('r', encoding='utf-8') as reader:
+                hello = json.loads(reader.readline() or '{}')
+
+            # Subscribe before taking the snapshot so no event falls between the two
+            subscription = self.events.subscribe(last_event_id=hello.get('since'))
+            conn.sendall(json_line(self.events.sequence, 'snapshot', self.snapshot()).encode())
+            while not self._stopping.is_set():
+                try:
+                    frame = subscription.get(timeout=self.heartbeat)
+                except StopIteration:
+                    break
+                conn.sendall((frame if frame is not None else '\n').encode())
+        except OSError:
+            pass
+        except Exception as e:
+            logger.error(f"Error serving live link connection: {e}")
+        finally:
+            if subscription is not None:
+                subscription.close()
+            conn.close()
+
+
+class LiveLinkClient:
+    """Follows a LiveLinkServer from a web worker process.
+
+    ``on_snapshot(data)`` is called with the collector's full state on every
+    (re)connect and ``on_event(event_type, data, event_id)`` for each event
+    after it, on the client's own thread. A reconnect asks for the events
+    after the last one handled, so those sent while the link was down are
+    replayed rather than lost. ``on_event`` returns False when the event does
+    not follow on from the local state, which makes the client reconnect and
+    start again from a fresh snapshot.
+    """
+
+    def __init__(self, path, on_snapshot, on_event, reconnect_delay=1.0, max_reconnect_delay=10.0, timeout=15.0):
+        self.path = path
+        self.on_snapshot = on_snapshot
+        self.on_event = on_event
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.timeout = timeout
+
+        self.is_connected = False
+        self.last_event_id = None
+        self.last_message = 0
+        self.events = 0
+        self.resyncs = 0
+        self.reconnects = 0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='live-link-client', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(self.timeout)
+            self._thread = None
+
+    def get_stats(self):
+        return {
+            'connected': self.is_connected,
+            'last_event_id': self.last_event_id,
+            # Seconds since anything (heartbeats included) arrived from the collector
+            'age': time.time() - self.last_message if self.last_message else None,
+            'events': self.events,
+            'resyncs': self.resyncs,
+            'reconnects': self.reconnects
+        }
+
+    def _follow(self, conn):
+        """Read the snapshot and events of one connection; True if it ended for a resync"""
+        conn.sendall((json.dumps({'since': self.last_event_id}) + '\n').encode())
+        reader = conn.makefile('r', encoding='utf-8')
+        for line in reader:
+            if self._stopping.is_set():
+                return
+            self.last_message = time.time()
+            if line == '\n':
+                continue
+            message = json.loads(line)
+            if message['type'] == 'snapshot':
+                self.on_snapshot(message['data'])
+                self.is_connected = True
+            elif self.on_event(message['type'], message['data'], message['id']) is False:
+                self.resyncs += 1
+                return True
+            else:
+                self.last_event_id = message['id']
+                self.events += 1
+        return False
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopping.is_set():
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            resync = False
+            try:
+                conn.connect(self.path)
+                delay = self.reconnect_delay
+                resync = self._follow(conn)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Live link to collector unavailable: {e}")
+            except Exception as e:
+                logger.error(f"Error following live link: {e}")
+            finally:
+                self.is_connected = False
+                conn.close()
+
+            if self._stopping.is_set():
+                break
+            if resync:
+                continue
+            self.reconnects += 1
+            self._stopping.wait(delay)
+            delay = min(self.max_reconnect_delay, delay * 2)
@@ -0,0 +1,190 @@
+import time
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('scheduler')
+
+# What to do when a job's next tick comes due while it is still running at its concurrency limit
+SKIP = 'skip'          # drop the tick (counted as an overrun)
+COALESCE = 'coalesce'  # run once as soon as the current run finishes, however many ticks were missed
+
+
+class Job:
+    """A periodic job and its run statistics"""
+
+    def __init__(self, name, func, interval, max_concurrency=1, overrun=SKIP, first_delay=0.0):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if overrun not in (SKIP, COALESCE):
+            raise ValueError(f"unknown overrun policy: {overrun}")
+
+        self.name = name
+        self.func = func
+        self.interval = float(interval)
+        self.max_concurrency = max_concurrency
+        self.overrun = overrun
+        self.first_delay = first_delay
+
+        self.executor = None
+        self.running = 0
+        self.pending = False
+        self.next_run = None
+        self.runs = 0
+        self.failures = 0
+        self.overruns = 0
+        self.missed = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.last_error = None
+
+    def get_stats(self):
+        return {
+            'interval': self.interval,
+            'running': self.running,
+            'runs': self.runs,
+            'failures': self.failures,
+            'overruns': self.overruns,
+            'missed': self.missed,
+            'last_duration': round(self.last_duration, 4),
+            'max_duration': round(self.max_duration, 4),
+            'last_error': self.last_error
+        }
+
+
+class Scheduler:
+    """Runs independent periodic jobs on monotonic deadlines.
+
+    A single dispatcher thread keeps a heap of deadlines and hands due jobs to
+    their own thread pool of ``max_concurrency`` threads, so a slow job (or
+    several) never takes the thread another job needs. Each deadline is the
+    previous deadline plus the interval, not "now plus the interval", so periods
+    do not drift by the time the work takes. Ticks that fall due while a job is
+    at its ``max_concurrency`` are handled by its overrun policy, and ticks
+    skipped because the process stalled (suspend, GC pause) are counted as
+    missed rather than replayed in a burst.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._heap = []
+        self._sequence = 0
+        self._lock = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def add_job(self, name, func, interval, max_concurrency=1, overrun=SKIP, first_delay=0.0):
+        """Register ``func()`` to run every ``interval`` seconds
+
+        Args:
+            name: unique job name (used in stats and logs)
+            func: callable taking no arguments
+            interval: period in seconds
+            max_concurrency: how many runs of this job may overlap
+            overrun: SKIP or COALESCE, applied when a tick is due at the concurrency limit
+            first_delay: seconds after start() before the first run
+        """
+        job = Job(name, func, interval, max_concurrency, overrun, first_delay)
+        with self._lock:
+            if name in self._jobs:
+                raise ValueError(f"job already exists: {name}")
+            self._jobs[name] = job
+            if self._running:
+                self._start_job(job, time.monotonic())
+        return job
+
+    def _start_job(self, job, now):
+        job.executor = ThreadPoolExecutor(max_workers=job.max_concurrency, thread_name_prefix=f'job-{job.name}')
+        self._schedule(job, now + job.first_delay)
+
+    def _schedule(self, job, deadline):
+        job.next_run = deadline
+        self._sequence += 1
+        heapq.heappush(self._heap, (deadline, self._sequence, job))
+        self._lock.notify()
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            now = time.monotonic()
+            for job in self._jobs.values():
+                self._start_job(job, now)
+        self._thread = threading.Thread(target=self._dispatch, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._heap.clear()
+            self._lock.notify()
+        self._thread.join()
+        for job in self._jobs.values():
+            job.executor.shutdown(wait=wait)
+
+    def get_stats(self):
+        with self._lock:
+            return {name: job.get_stats() for name, job in self._jobs.items()}
+
+    def _dispatch(self):
+        with self._lock:
+            while self._running:
+                if not self._heap:
+                    self._lock.wait()
+                    continue
+
+                deadline, _, job = self._heap[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self._lock.wait(deadline - now)
+                    continue
+                heapq.heappop(self._heap)
+
+                if job.running < job.max_concurrency:
+                    self._submit(job)
+                elif job.overrun == COALESCE:
+                    job.pending = True
+                    job.overruns += 1
+                else:
+                    job.overruns += 1
+                    logger.debug(f"Job '{job.name}' still running; skipping tick")
+
+                # Next deadline stays on the original grid; ticks already in the past are missed
+                next_deadline = deadline + job.interval
+                if next_deadline <= now:
+                    behind = int((now - next_deadline) // job.interval) + 1
+                    job.missed += behind
+                    next_deadline += behind * job.interval
+                self._schedule(job, next_deadline)
+
+    def _submit(self, job):
+        try:
+            job.executor.submit(self._run, job)
+        except RuntimeError:
+            # The pool is shut down (interpreter exit); stop dispatching
+            self._running = False
+            return
+        job.running += 1
+
+    def _run(self, job):
+        start = time.monotonic()
+        try:
+            job.func()
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Job '{job.name}' failed: {e}")
+        finally:
+            duration = time.monotonic() - start
+            with self._lock:
+                job.running -= 1
+                job.runs += 1
+                job.last_duration = duration
+                job.max_duration = max(job.max_duration, duration)
+                if job.pending and self._running:
+                    job.pending = False
+                    self._submit(job)
@@ -0,0 +1,126 @@
+import time
+import socket
+import sqlite3
+
+import pytest
+import requests
+
+from api.binance_stub import BinanceStubServer
+from backfill import KlineBackfiller
+from db_handler import DatabaseHandler
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(**kwargs):
+    return BinanceStubServer(port=free_port(), rate=1, **kwargs).start()
+
+
+def kline_url(stub):
+    return f'http://{stub.host}:{stub.port}/api/v3/klines'
+
+
+@pytest.fixture
+def db(tmp_path):
+    handler = DatabaseHandler(str(tmp_path / 'backfill.db'), compact_schema=True)
+    yield handler
+    handler.disconnect()
+
+
+def stored_candles(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute('SELECT ts_ms, open, high, low, close FROM btc_backfill ORDER BY ts_ms').fetchall()
+
+
+def test_only_closed_klines_are_returned():
+    stub = start_stub()
+    backfiller = KlineBackfiller(None, url=kline_url(stub))
+    try:
+        now = time.time()
+        candles = backfiller.fetch_page(int((now - 600) * 1000), int((now + 120) * 1000))
+    finally:
+        backfiller.close()
+        stub.stop()
+
+    # The stub also serves the candle that is still open; it must not come back
+    assert len(candles) in (9, 10)
+    assert all(close_time <= time.time() for *_, close_time in candles)
+    assert candles[-1][-1] > now - 60
+
+
+@pytest.mark.parametrize('status', [429, 418])
+def test_rate_limit_pauses_for_retry_after(status):
+    stub = start_stub(weight_limit=4, retry_after=1)
+    backfiller = KlineBackfiller(None, url=kline_url(stub))
+    now = time.time()
+    page = (int((now - 600) * 1000), int(now * 1000))
+    try:
+        if status == 418:
+            # Someone else spent the weight; our next request lands inside their Retry-After
+            for _ in range(3):
+                requests.get(kline_url(stub), params={'limit': 1000})
+        else:
+            backfiller.fetch_page(*page)
+            backfiller.fetch_page(*page)
+
+        with pytest.raises(requests.HTTPError) as error:
+            backfiller.fetch_page(*page)
+        assert error.value.response.status_code == status
+        assert backfiller.get_stats()['rate_limited'] == 1
+        assert backfiller.blocked_until > time.time()
+
+        # The next request waits out the pause instead of being sent (and banned)
+        sent = stub.kline_requests
+        started = time.monotonic()
+        backfiller._throttle()
+        assert time.monotonic() - started >= 0.5
+        assert stub.kline_requests == sent
+    finally:
+        backfiller.close()
+        stub.stop()
+
+
+def test_gap_ending_within_one_interval_is_left_for_later(db):
+    now = time.time()
+    db.save_btc_price(78000.0, timestamp=now - 600)
+    db.save_btc_price(78100.0, timestamp=now - 5)
+
+    stub = start_stub()
+    backfiller = KlineBackfiller(db, url=kline_url(stub))
+    try:
+        assert backfiller.run() == 0
+    finally:
+        backfiller.close()
+        stub.stop()
+
+    assert stub.kline_requests == 0
+    assert stored_candles(db) == []
+    assert len(db.find_btc_gaps(now - 3600)) == 1
+
+
+def test_rerun_stores_nothing_new(db):
+    now = time.time()
+    db.save_btc_price(78000.0, timestamp=now - 3 * 3600)
+    db.save_btc_price(78100.0, timestamp=now - 2 * 3600)
+
+    stub = start_stub()
+    backfiller = KlineBackfiller(db, url=kline_url(stub))
+    try:
+        stored = backfiller.run()
+        candles = stored_candles(db)
+        requests_made = stub.kline_requests
+
+        assert backfiller.run() == 0
+    finally:
+        backfiller.close()
+        stub.stop()
+
+    assert stored in (59, 60)
+    assert len(candles) == stored
+    assert stored_candles(db) == candles
+    assert stub.kline_requests == requests_made
+    assert db.find_btc_gaps(now - 4 * 3600) == []
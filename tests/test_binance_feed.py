@@ -0,0 +1,108 @@
+import time
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from api.binance_feed import BinanceFeed
+from api.binance_stub import BinanceStubServer
+from live_buffer import TieredSeries
+
+TIERS = (('1s', 1, 60), ('10s', 10, 600))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def closed_rows(tiers):
+    data = tiers.tier('1s').snapshot(copy=True).data
+    return {timestamp: (price, equity)
+            for timestamp, price, equity in zip(data['timestamp'], data['btc_price'], data['equity'])}
+
+
+@pytest.fixture
+def stub():
+    server = BinanceStubServer(port=free_port(), rate=50, clock_offset=0.2).start()
+    yield server
+    server.stop()
+
+
+def test_feed_reconnects_after_a_drop_and_never_reopens_a_closed_bucket(stub):
+    tiers = TieredSeries(columns=('btc_price', 'equity'), ohlc_columns=('btc_price',), tiers=TIERS)
+    feed = BinanceFeed(url=stub.url, reconnect_delay=0.05, max_reconnect_delay=0.1)
+    feed.add_callback(lambda price, timestamp, source: tiers.append(time.time(), btc_price=price))
+    feed.start()
+    try:
+        assert wait_for(lambda: feed.messages > 20)
+        before = closed_rows(tiers)
+
+        stub.drop_clients()
+        assert wait_for(lambda: feed.reconnects >= 1 and stub.connections >= 2)
+        received = feed.messages
+        assert wait_for(lambda: feed.messages > received + 20)
+        time.sleep(1.1)
+    finally:
+        feed.stop()
+
+    after = closed_rows(tiers)
+    assert len(after) > len(before)
+    # Buckets closed before the drop are exactly as they were
+    for timestamp, row in before.items():
+        assert after[timestamp] == row
+    assert np.all(np.diff(sorted(after)) > 0)
+
+
+@pytest.mark.parametrize('stamp', ['received', 'exchange'])
+def test_samples_survive_a_feed_clock_running_ahead(stub, stamp):
+    """Trades stamped 200 ms ahead of the local samples must not push the samples out"""
+    tiers = TieredSeries(columns=('btc_price', 'equity'), ohlc_columns=('btc_price',), tiers=TIERS)
+    if stamp == 'received':
+        callback = lambda price, timestamp, source: tiers.append(time.time(), btc_price=price)
+    else:
+        callback = lambda price, timestamp, source: tiers.append(timestamp, btc_price=price)
+
+    feed = BinanceFeed(url=stub.url, streams=('trade',), reconnect_delay=0.05)
+    feed.add_callback(callback)
+    feed.start()
+    stop = threading.Event()
+    samples = []
+
+    def sample():
+        # Late in each second, where trades stamped ahead have already opened the next bucket
+        while not stop.is_set():
+            now = time.time()
+            time.sleep(int(now) + 0.9 - now if now % 1 < 0.9 else int(now) + 1.9 - now)
+            samples.append(len(samples) + 1)
+            tiers.append(time.time(), btc_price=78000.0, equity=float(samples[-1]))
+
+    try:
+        assert wait_for(lambda: feed.messages > 0)
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+        time.sleep(3.5)
+        stop.set()
+        sampler.join()
+    finally:
+        feed.stop()
+
+    if stamp == 'exchange':
+        assert tiers.late_ticks > 0
+
+    window = tiers.window(60)
+    equity = window['equity'][window['equity'] > 0]
+    # Every sample reached the 1s tier: each one is the close of its own bucket
+    assert sorted(set(equity)) == [float(value) for value in samples]
+    assert equity[-1] == samples[-1]
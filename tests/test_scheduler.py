@@ -0,0 +1,44 @@
+import time
+import threading
+
+from scheduler import Scheduler
+
+
+def test_slow_jobs_do_not_delay_a_fast_job():
+    release = threading.Event()
+    ticks = []
+
+    scheduler = Scheduler()
+    scheduler.add_job('fast', lambda: ticks.append(time.monotonic()), 0.05)
+    # More blocked jobs than the old shared pool had threads
+    for index in range(6):
+        scheduler.add_job(f'slow_{index}', lambda: release.wait(5), 0.05)
+
+    scheduler.start()
+    try:
+        time.sleep(1.0)
+    finally:
+        release.set()
+        scheduler.stop()
+
+    stats = scheduler.get_stats()
+    assert stats['fast']['runs'] >= 15
+    assert stats['fast']['overruns'] == 0
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.2
+    for index in range(6):
+        assert stats[f'slow_{index}']['overruns'] > 0
+
+
+def test_job_added_after_start_gets_its_own_thread():
+    release = threading.Event()
+    scheduler = Scheduler()
+    scheduler.add_job('slow', lambda: release.wait(5), 0.05)
+    scheduler.start()
+    try:
+        runs = []
+        scheduler.add_job('late', lambda: runs.append(1), 0.05)
+        time.sleep(0.5)
+        assert len(runs) >= 5
+    finally:
+        release.set()
+        scheduler.stop()